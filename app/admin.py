@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
 from functools import wraps
-from app.models import db, User
+from app.models import db, User, UserDomain
+from app.directadmin_api import cache_stats
+from app.forwarder_feed import forwarder_feed, snapshot_cache
 from werkzeug.security import generate_password_hash
 import secrets
 
@@ -25,8 +27,49 @@ def users():
 @admin_bp.route('/api/users')
 @admin_required
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """One page of users ordered by username, optionally filtered by a username search
+
+    The cursor is the last username of the previous page. Domains for the whole page come
+    from a single query, so the statement count does not grow with the page size.
+    """
+    limit = max(1, min(request.args.get('limit', type=int) or 50, 200))
+    search = request.args.get('q', '').strip().lower()
+    cursor = request.args.get('cursor')
+
+    query = User.query
+    if search:
+        query = query.filter(db.func.lower(User.username).contains(search, autoescape=True))
+    total = query.count()
+    if cursor:
+        query = query.filter(User.username > cursor)
+    users = query.order_by(User.username).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = users[-1].username
+
+    domains = {user.id: [] for user in users}
+    if users:
+        rows = db.session.execute(
+            db.select(UserDomain.user_id, UserDomain.domain)
+            .where(UserDomain.user_id.in_(list(domains)))
+            .order_by(UserDomain.user_id, UserDomain.order_index)
+        )
+        for user_id, domain in rows:
+            domains[user_id].append(domain)
+
+    return jsonify({
+        'users': [user.to_dict(domains=domains[user.id]) for user in users],
+        'total': total,
+        'next_cursor': next_cursor
+    })
+
+@admin_bp.route('/api/users/<int:user_id>')
+@admin_required
+def get_user(user_id):
+    user = User.query.get_or_404(user_id)
+    return jsonify(user.to_dict())
 
 @admin_bp.route('/api/users', methods=['POST'])
 @admin_required
@@ -114,6 +157,11 @@ def delete_user(user_id):
 
     return jsonify({'success': True})
 
+@admin_bp.route('/api/cache-stats')
+@admin_required
+def get_cache_stats():
+    return jsonify({'caches': cache_stats() + [snapshot_cache.stats()], 'feed': forwarder_feed.stats()})
+
 @admin_bp.route('/api/users/<int:user_id>/generate-password')
 @admin_required
 def generate_password(user_id):
@@ -0,0 +1,402 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.config import Config
+from app.directadmin_api import DirectAdminAPI, DeadlineExceeded, deadline, server_slots
+from app.job_queue import job_queue
+
+
+def iter_domain_forwarders(server, username, password, domains, max_workers=None, domain_deadline=None,
+                           refresh=False, check_account=True):
+    """Fetch the forwarders of several domains on a bounded pool, yielding a result per domain as it finishes
+
+    Results are {'domain', 'success', 'count', 'forwarders'} or {'domain', 'success': False, 'error'}.
+    refresh bypasses the forwarder cache; check_account first confirms each domain against the
+    (cached) DirectAdmin domain list. Closing the generator early abandons the domains still outstanding.
+    """
+    max_workers = max_workers or Config.DA_FANOUT_WORKERS
+    domain_deadline = domain_deadline or Config.DA_REQUEST_DEADLINE
+
+    def fetch(domain, account_domains):
+        try:
+            if account_domains is not None and domain not in account_domains:
+                return {'domain': domain, 'success': False, 'error': 'Domain not found in DirectAdmin account'}
+            api = DirectAdminAPI(server, username, password, domain)
+            with deadline(domain_deadline):
+                forwarders = api.load_forwarders(refresh=refresh)
+            if forwarders is None:
+                return {'domain': domain, 'success': False, 'error': 'No valid response from DirectAdmin'}
+            return {'domain': domain, 'success': True, 'count': len(forwarders), 'forwarders': forwarders}
+        except DeadlineExceeded:
+            return {'domain': domain, 'success': False, 'error': 'DirectAdmin server did not respond in time', 'timeout': True}
+        except Exception as e:
+            print(f"Error fetching forwarders for {domain}: {e}")
+            return {'domain': domain, 'success': False, 'error': 'Failed to fetch forwarders'}
+
+    # One cached domain list check covers every domain
+    account_domains = None
+    if check_account:
+        try:
+            with deadline(domain_deadline):
+                account_domains = DirectAdminAPI(server, username, password).get_account_domains(allow_stale=True)
+        except DeadlineExceeded:
+            pass
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='da-fanout')
+    try:
+        futures = [executor.submit(fetch, domain, account_domains) for domain in domains]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Client went away or we are done: never wait for leftover domains
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def apply_operations(server, username, password, operations, progress=None):
+    """Run validated create/delete operations against DirectAdmin; returns [(success, message)] in order
+
+    Each operation is {'op', 'domain', 'address'} plus 'destination' for creates. Deletes are
+    sent as multi-select calls per domain, and server_slots bounds the calls in flight per
+    server. progress(n) is called as each group of n operations completes.
+    """
+    call_deadline = Config.DA_REQUEST_DEADLINE
+    chunk_size = Config.DA_BATCH_DELETE_SIZE
+    results = [None] * len(operations)
+    deletes = {}  # domain -> {full address: [indexes]}
+
+    def create(index, operation):
+        with server_slots.slot(server), deadline(call_deadline):
+            api = DirectAdminAPI(server, username, password, operation['domain'])
+            return {index: api.create_forwarder(operation['address'], operation['destination'])}
+
+    def delete(domain, addresses):
+        with server_slots.slot(server), deadline(call_deadline):
+            api = DirectAdminAPI(server, username, password, domain)
+            return api.delete_forwarders(addresses, chunk_size=chunk_size)
+
+    with ThreadPoolExecutor(max_workers=Config.DA_SERVER_CONCURRENCY, thread_name_prefix='da-batch') as executor:
+        tasks = {}  # future -> [(index, key of its outcome)]
+        for index, operation in enumerate(operations):
+            if operation['op'] == 'create':
+                tasks[executor.submit(create, index, operation)] = [(index, index)]
+            else:
+                address = operation['address']
+                if '@' not in address:
+                    address = f"{address}@{operation['domain']}"
+                deletes.setdefault(operation['domain'], {}).setdefault(address, []).append(index)
+
+        for domain, by_address in deletes.items():
+            addresses = list(by_address)
+            for start in range(0, len(addresses), chunk_size):
+                chunk = addresses[start:start + chunk_size]
+                tasks[executor.submit(delete, domain, chunk)] = [
+                    (index, address) for address in chunk for index in by_address[address]
+                ]
+
+        for future in as_completed(tasks):
+            try:
+                outcome = future.result()
+            except DeadlineExceeded:
+                outcome = None
+                error = 'DirectAdmin server did not respond in time'
+            except Exception as e:
+                print(f"Bulk operation failed: {e}")
+                outcome = None
+                error = 'Operation failed'
+
+            for index, key in tasks[future]:
+                results[index] = outcome[key] if outcome is not None else (False, error)
+            if progress:
+                progress(len(tasks[future]))
+
+    return results
+
+
+def _import_rows(stream, fmt):
+    """Yield (line number, row dict) from an uploaded CSV or NDJSON file without reading it whole"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {k.strip().lower(): v for k, v in row.items() if k}
+
+
+def parse_import(stream, fmt, server, username, password, user_domains, default_domain=None, max_rows=None):
+    """Parse and validate an upload into create operations
+
+    Rows need an address and destination (and a domain unless the address includes one);
+    destinations are checked with the same rules as create_forwarder. Returns
+    (operations, errors) where errors are {'line', 'error'}.
+    """
+    max_rows = max_rows or Config.DA_IMPORT_MAX_ROWS
+    operations, errors = [], []
+    apis = {}
+
+    for line_number, row in _import_rows(stream, fmt):
+        if row is None:
+            errors.append({'line': line_number, 'error': 'Unreadable row'})
+            continue
+        if len(operations) >= max_rows:
+            errors.append({'line': line_number, 'error': f'Import is limited to {max_rows} rows'})
+            break
+
+        address = str(row.get('address') or '').strip()
+        domain = str(row.get('domain') or '').strip()
+        if '@' in address:
+            address, domain = address.split('@', 1)[0], domain or address.split('@', 1)[1]
+        domain = domain or default_domain
+
+        if not address:
+            errors.append({'line': line_number, 'error': 'Email address is required'})
+            continue
+        if domain not in user_domains:
+            errors.append({'line': line_number, 'error': f'Access denied to domain {domain}'})
+            continue
+
+        api = apis.get(domain)
+        if api is None:
+            api = apis[domain] = DirectAdminAPI(server, username, password, domain)
+        destination, error = api.normalize_destination(str(row.get('destination') or ''))
+        if error:
+            errors.append({'line': line_number, 'error': error})
+            continue
+
+        operations.append({'op': 'create', 'domain': domain, 'address': f'{address}@{domain}',
+                           'destination': destination, 'line': line_number})
+
+    return operations, errors
+
+
+def load_desired_state(text, fmt='json'):
+    """Parse a desired-state document mapping domain -> alias -> destination (or list of destinations)
+
+    YAML needs PyYAML (in requirements.txt). Raises ValueError for unreadable or malformed documents.
+    """
+    if fmt == 'yaml':
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('YAML desired-state files need PyYAML (pip install pyyaml); use JSON instead')
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f'Invalid YAML: {e}')
+    else:
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f'Invalid JSON: {e}')
+
+    if not isinstance(data, dict):
+        raise ValueError('Desired state must map domains to their aliases')
+
+    desired = {}
+    for domain, aliases in data.items():
+        if aliases is None:
+            aliases = {}
+        if not isinstance(aliases, dict):
+            raise ValueError(f'Aliases of {domain} must map alias -> destination')
+        entries = {}
+        for alias, destinations in aliases.items():
+            if isinstance(destinations, str):
+                destinations = destinations.split(',')
+            if not isinstance(destinations, list) or not destinations:
+                raise ValueError(f'Destination of {alias}@{domain} must be a string or a list')
+            entries[str(alias).split('@', 1)[0].strip().lower()] = [str(d).strip() for d in destinations]
+        desired[str(domain).strip().lower()] = entries
+    return desired
+
+
+def _destination_set(destination):
+    return frozenset(d.strip().lower() for d in destination.split(',') if d.strip())
+
+
+def plan_sync(server, username, password, desired, user_domains):
+    """Work out the minimal creates and deletes that bring DirectAdmin to the desired state
+
+    Current state is read fresh, once per domain. Aliases missing from a listed domain are
+    deleted; an alias whose destinations changed is deleted and recreated. Domains not in the
+    document are left alone.
+    """
+    plan = {'domains': [], 'creates': [], 'deletes': [], 'errors': []}
+    for domain in desired:
+        if domain not in user_domains:
+            plan['errors'].append({'domain': domain, 'error': 'Access denied to domain'})
+    domains = [d for d in desired if d in user_domains]
+
+    results = iter_domain_forwarders(server, username, password, domains, refresh=True, check_account=False)
+    for result in results:
+        domain = result['domain']
+        if not result['success']:
+            plan['errors'].append({'domain': domain, 'error': result['error']})
+            continue
+
+        current = {}
+        for forwarder in result['forwarders']:
+            alias = forwarder['address'].split('@', 1)[0].lower()
+            current[alias] = _destination_set(forwarder['destination'])
+
+        api = DirectAdminAPI(server, username, password, domain)
+        wanted = {}
+        for alias, destinations in desired[domain].items():
+            normalized = []
+            for destination in destinations:
+                destination, error = api.normalize_destination(destination)
+                if error:
+                    plan['errors'].append({'domain': domain, 'address': f'{alias}@{domain}', 'error': error})
+                    break
+                normalized.append(destination)
+            else:
+                wanted[alias] = ','.join(normalized)
+
+        summary = {'domain': domain, 'create': 0, 'delete': 0, 'replace': 0, 'unchanged': 0}
+        for alias in sorted(current):
+            if alias not in desired[domain]:
+                plan['deletes'].append({'op': 'delete', 'domain': domain, 'address': f'{alias}@{domain}'})
+                summary['delete'] += 1
+        for alias, destination in sorted(wanted.items()):
+            operation = {'op': 'create', 'domain': domain, 'address': f'{alias}@{domain}', 'destination': destination}
+            if alias not in current:
+                plan['creates'].append(operation)
+                summary['create'] += 1
+            elif current[alias] != _destination_set(destination):
+                plan['deletes'].append({'op': 'delete', 'domain': domain, 'address': f'{alias}@{domain}'})
+                plan['creates'].append(dict(operation, replaces=True))
+                summary['replace'] += 1
+            else:
+                summary['unchanged'] += 1
+        plan['domains'].append(summary)
+
+    plan['domains'].sort(key=lambda summary: summary['domain'])
+    return plan
+
+
+def apply_sync(server, username, password, plan, progress=None):
+    """Apply a plan from plan_sync(); returns one result dict per operation
+
+    Deletes and new aliases go out together; a replaced alias is only recreated once its
+    delete succeeded.
+    """
+    first = plan['deletes'] + [c for c in plan['creates'] if not c.get('replaces')]
+    if not first and not plan['creates']:
+        return []
+
+    outcomes = dict(zip(
+        ((o['op'], o['address']) for o in first),
+        apply_operations(server, username, password, first, progress=progress)
+    ))
+    second = [c for c in plan['creates'] if c.get('replaces') and outcomes[('delete', c['address'])][0]]
+    outcomes.update(zip(
+        ((o['op'], o['address']) for o in second),
+        apply_operations(server, username, password, second, progress=progress)
+    ))
+
+    results = []
+    for operation in plan['deletes'] + plan['creates']:
+        outcome = outcomes.get((operation['op'], operation['address']))
+        result = {k: v for k, v in operation.items() if k != 'replaces'}
+        if outcome is None:
+            results.append(dict(result, success=False, error='Skipped because the old forwarder could not be deleted'))
+        else:
+            success, message = outcome
+            results.append(dict(result, success=success, **({'message': message} if success else {'error': message})))
+    return results
+
+
+# ----- Queued jobs (see app/job_queue.py) -----
+
+# Per-row errors kept in a job result
+MAX_JOB_ERRORS = 100
+
+
+def _job_user(ctx):
+    """The user who queued the job, with DirectAdmin still configured"""
+    from app.models import db, User
+    user = db.session.get(User, ctx.user_id)
+    if user is None or not user.has_da_config():
+        raise RuntimeError('User no longer exists or DirectAdmin is not configured')
+    return user
+
+
+def _result(stub, success, message):
+    return dict(stub, success=success, **({'message': message} if success else {'error': message}))
+
+
+@job_queue.handler('forwarders.batch')
+def run_batch_job(ctx, payload):
+    """Apply the accepted operations of a /api/forwarders/batch request"""
+    user = _job_user(ctx)
+    results = payload['results']
+    accepted = payload['accepted']
+    ctx.advance(len(results) - len(accepted))
+
+    outcomes = apply_operations(user.da_server, user.da_username, user.get_da_password(),
+                                [item['operation'] for item in accepted], progress=ctx.advance)
+    for item, (success, message) in zip(accepted, outcomes):
+        results[item['index']] = _result(item['result'], success, message)
+
+    succeeded = sum(1 for r in results if r['success'])
+    return {'succeeded': succeeded, 'failed': len(results) - succeeded, 'results': results}
+
+
+@job_queue.handler('forwarders.import')
+def run_import_job(ctx, payload):
+    """Create the validated rows of an import, skipping forwarders that already exist"""
+    user = _job_user(ctx)
+    server, username, password = user.da_server, user.da_username, user.get_da_password()
+    operations = payload['operations']
+
+    # Reading current state first makes the job safe to retry, and re-running an import harmless
+    existing = {}
+    for domain in sorted({operation['domain'] for operation in operations}):
+        forwarders = DirectAdminAPI(server, username, password, domain).load_forwarders(refresh=True)
+        if forwarders is None:
+            raise RuntimeError(f'Could not read the current forwarders of {domain}')
+        existing[domain] = {(f['address'], f['destination']) for f in forwarders}
+
+    pending = [o for o in operations if (o['address'], o['destination']) not in existing[o['domain']]]
+    ctx.advance(len(operations) - len(pending))
+
+    errors = list(payload['errors'])
+    succeeded = 0
+    for operation, (success, message) in zip(
+            pending, apply_operations(server, username, password, pending, progress=ctx.advance)):
+        if success:
+            succeeded += 1
+        elif len(errors) < MAX_JOB_ERRORS:
+            errors.append({'line': operation['line'], 'error': message})
+
+    return {
+        'succeeded': succeeded,
+        'failed': len(pending) - succeeded,
+        'skipped': len(operations) - len(pending),
+        'rejected': payload['rejected'],
+        'errors': errors
+    }
+
+
+@job_queue.handler('forwarders.sync')
+def run_sync_job(ctx, payload):
+    """Plan and apply a desired-state sync; domains that could not be read make the job retry"""
+    user = _job_user(ctx)
+    server, username, password = user.da_server, user.da_username, user.get_da_password()
+    plan = plan_sync(server, username, password, payload['state'], set(user.get_domains()))
+    ctx.set_total(len(plan['creates']) + len(plan['deletes']))
+    results = apply_sync(server, username, password, plan, progress=ctx.advance)
+
+    unread = [e['domain'] for e in plan['errors'] if 'address' not in e and e['error'] != 'Access denied to domain']
+    if unread:
+        # Syncing is idempotent, so the retry simply re-plans against the fresh state
+        raise RuntimeError(f"Could not read {', '.join(sorted(unread))}")
+    return {'plan': plan, 'results': results}
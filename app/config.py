@@ -16,6 +16,32 @@ def _bool(env_name: str, default: bool) -> bool:
         return default
     return val.strip().lower() in ('1', 'true', 'yes', 'on')
 
+def _seconds_map(env_name: str) -> dict:
+    """Parse 'endpoint=seconds,endpoint2=seconds' into a dict"""
+    result = {}
+    for item in os.environ.get(env_name, '').split(','):
+        if '=' in item:
+            key, value = item.split('=', 1)
+            result[key.strip()] = float(value)
+    return result
+
+def _engine_options(uri: str) -> dict:
+    """SQLAlchemy engine options for the configured database
+
+    SQLite needs no pool tuning (its pragmas are applied per connection in app/models.py);
+    server databases such as PostgreSQL get a sized, pre-pinged and recycled pool.
+    """
+    if uri.startswith('sqlite'):
+        # The driver's own wait, in seconds, matching PRAGMA busy_timeout
+        return {'connect_args': {'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', '5000')) / 1000}}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True
+    }
+
 class Config:
     # Core settings
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-this'
@@ -24,6 +50,13 @@ class Config:
     _default_sqlite_path = os.path.join(DATA_DIR, 'users.db')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{_default_sqlite_path}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # SQLite connection profile: WAL lets readers run alongside the single writer, and writers
+    # wait up to DB_BUSY_TIMEOUT milliseconds for the lock instead of failing with "database is locked"
+    DB_SQLITE_JOURNAL_MODE = os.environ.get('DB_SQLITE_JOURNAL_MODE', 'WAL').upper()
+    DB_SQLITE_SYNCHRONOUS = os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+    DB_BUSY_TIMEOUT = int(os.environ.get('DB_BUSY_TIMEOUT', '5000'))
 
     # Session configuration
     SESSION_COOKIE_HTTPONLY = True
@@ -50,6 +83,78 @@ class Config:
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     FLASK_ENV = os.environ.get('FLASK_ENV', 'production')
 
+    # DirectAdmin HTTP connection pooling (keep-alive sessions per server/user)
+    DA_POOL_SIZE = int(os.environ.get('DA_POOL_SIZE', '4'))
+    DA_SESSION_IDLE_TIMEOUT = int(os.environ.get('DA_SESSION_IDLE_TIMEOUT', '300'))
+
+    # Where DirectAdmin result caches live: "memory" (per worker), "sqlite" (shared file in
+    # DATA_DIR) or a redis:// URL (shared by every worker and host)
+    DA_CACHE_BACKEND = os.environ.get('DA_CACHE_BACKEND', 'memory')
+    DA_CACHE_SQLITE_PATH = os.environ.get('DA_CACHE_SQLITE_PATH', os.path.join(DATA_DIR, 'da_cache.db'))
+    # With the memory backend, changes made in one process (such as the job runner) are
+    # announced through the SQLite file above; others pick them up within this many seconds
+    DA_CACHE_SYNC_INTERVAL = float(os.environ.get('DA_CACHE_SYNC_INTERVAL', '1'))
+
+    # Seconds a parsed DirectAdmin domain list is reused before re-fetching
+    DA_DOMAIN_CACHE_TTL = int(os.environ.get('DA_DOMAIN_CACHE_TTL', '300'))
+
+    # Forwarder list cache (per server/user/domain); writes through on create/delete
+    DA_FORWARDER_CACHE_TTL = int(os.environ.get('DA_FORWARDER_CACHE_TTL', '120'))
+    DA_FORWARDER_CACHE_SIZE = int(os.environ.get('DA_FORWARDER_CACHE_SIZE', '512'))
+    DA_ACCOUNT_CACHE_TTL = int(os.environ.get('DA_ACCOUNT_CACHE_TTL', '300'))
+
+    # How long past its TTL a cached result may still be served (with stale=true) while it refreshes
+    DA_STALE_TTL = int(os.environ.get('DA_STALE_TTL', '3600'))
+
+    # Store the endpoint variant that works per DirectAdmin server in the database
+    DA_PERSIST_ENDPOINT_VARIANTS = _bool('DA_PERSIST_ENDPOINT_VARIANTS', default=True)
+
+    # Probe unknown endpoint variants concurrently (first valid response wins)
+    DA_PARALLEL_PROBE = _bool('DA_PARALLEL_PROBE', default=False)
+
+    # Server-sent forwarder change feed: refresh interval per domain, open streams per worker
+    # (each holds a gunicorn thread) and how long a stream lasts before the browser reconnects
+    DA_STREAM_INTERVAL = int(os.environ.get('DA_STREAM_INTERVAL', '30'))
+    DA_STREAM_MAX_CLIENTS = int(os.environ.get('DA_STREAM_MAX_CLIENTS', '2'))
+    DA_STREAM_MAX_SECONDS = int(os.environ.get('DA_STREAM_MAX_SECONDS', '300'))
+
+    # Forwarder list snapshots kept for ?since=<version> delta responses
+    DA_SNAPSHOT_TTL = int(os.environ.get('DA_SNAPSHOT_TTL', '900'))
+    DA_SNAPSHOT_CACHE_SIZE = int(os.environ.get('DA_SNAPSHOT_CACHE_SIZE', '2048'))
+
+    # Default and maximum page sizes for paged forwarder listings
+    DA_PAGE_SIZE = int(os.environ.get('DA_PAGE_SIZE', '100'))
+    DA_MAX_PAGE_SIZE = int(os.environ.get('DA_MAX_PAGE_SIZE', '1000'))
+
+    # Concurrent DirectAdmin fetches when listing forwarders across all of a user's domains
+    DA_FANOUT_WORKERS = int(os.environ.get('DA_FANOUT_WORKERS', '4'))
+
+    # Bulk forwarder changes (and bulk domain adds): operations per request, aliases per delete call,
+    # and concurrent create calls per DirectAdmin server
+    DA_BATCH_MAX_ITEMS = int(os.environ.get('DA_BATCH_MAX_ITEMS', '1000'))
+    DA_BATCH_DELETE_SIZE = int(os.environ.get('DA_BATCH_DELETE_SIZE', '50'))
+    DA_SERVER_CONCURRENCY = int(os.environ.get('DA_SERVER_CONCURRENCY', '4'))
+
+    # Forwarder imports: rows accepted per file
+    DA_IMPORT_MAX_ROWS = int(os.environ.get('DA_IMPORT_MAX_ROWS', '10000'))
+
+    # Background job queue (SQLite file in DATA_DIR): worker threads, polling, retries with
+    # exponential backoff, and how long finished jobs stay pollable
+    DA_JOB_DB_PATH = os.environ.get('DA_JOB_DB_PATH', os.path.join(DATA_DIR, 'jobs.db'))
+    DA_JOB_WORKERS = int(os.environ.get('DA_JOB_WORKERS', '2'))
+    DA_JOB_POLL_INTERVAL = float(os.environ.get('DA_JOB_POLL_INTERVAL', '1'))
+    DA_JOB_MAX_ATTEMPTS = int(os.environ.get('DA_JOB_MAX_ATTEMPTS', '3'))
+    DA_JOB_RETRY_BASE = float(os.environ.get('DA_JOB_RETRY_BASE', '30'))
+    DA_JOB_RETRY_MAX = float(os.environ.get('DA_JOB_RETRY_MAX', '600'))
+    DA_JOB_TTL = int(os.environ.get('DA_JOB_TTL', '86400'))
+
+    # Per-call DirectAdmin timeouts, and the total budget one incoming request may spend upstream.
+    # DA_ROUTE_DEADLINES overrides the budget per Flask endpoint, e.g. "get_forwarders=15,settings.test_connection=8"
+    DA_CONNECT_TIMEOUT = float(os.environ.get('DA_CONNECT_TIMEOUT', '5'))
+    DA_READ_TIMEOUT = float(os.environ.get('DA_READ_TIMEOUT', '10'))
+    DA_REQUEST_DEADLINE = float(os.environ.get('DA_REQUEST_DEADLINE', '25'))
+    DA_ROUTE_DEADLINES = _seconds_map('DA_ROUTE_DEADLINES')
+
     # Expose data dir path for other modules if needed
     DATA_DIR = DATA_DIR
 
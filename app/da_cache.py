@@ -0,0 +1,530 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.config import Config
+
+
+class MemoryBackend:
+    """Per-process LRU store; each gunicorn worker keeps its own copy"""
+
+    shared = False
+
+    def __init__(self, namespace, max_entries):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, stored_at, expires_at)
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (value, stored_at) or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() > entry[2]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, value, ttl, stored_at=None):
+        """Store value, evicting the least recently used entries if full"""
+        stored_at = stored_at or time.time()
+        with self._lock:
+            self._entries[key] = (value, stored_at, stored_at + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key, func):
+        """Replace a live value with func(value), keeping its age; False when nothing is cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() > entry[2]:
+                return False
+            self._entries[key] = (func(entry[0]), entry[1], entry[2])
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteBackend:
+    """WAL-mode SQLite file shared by every worker on the host
+
+    Reads stay read-only: recency for LRU eviction is recorded at most once per
+    ACCESS_RESOLUTION seconds per key, so cache hits do not queue on the file's write lock.
+    """
+
+    shared = True
+
+    # Seconds of slack in accessed_at; eviction order is only this precise
+    ACCESS_RESOLUTION = 30
+
+    # Idle connections kept per process; short-lived pool threads borrow them instead of opening their own
+    MAX_IDLE_CONNECTIONS = 8
+
+    def __init__(self, namespace, max_entries, path=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.path = path or Config.DA_CACHE_SQLITE_PATH
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS da_cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_da_cache_accessed ON da_cache (namespace, accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        """Borrow a pooled connection; connections are never reused across a fork"""
+        if self._pid != os.getpid():
+            # The parent's connections (and its lock, possibly held at fork) stay with the parent
+            self._lock = threading.Lock()
+            self._idle = []
+            self._pid = os.getpid()
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:
+                if len(self._idle) < self.MAX_IDLE_CONNECTIONS and self._pid == os.getpid():
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, stored_at, expires_at, accessed_at FROM da_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if now > row[2]:
+                conn.execute("DELETE FROM da_cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                return None
+            if now - row[3] > self.ACCESS_RESOLUTION:
+                conn.execute(
+                    "UPDATE da_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key)
+                )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl, stored_at=None):
+        stored_at = stored_at or time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO da_cache (namespace, key, value, stored_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), stored_at, stored_at + ttl, time.time())
+            )
+            self._prune(conn)
+
+    def _prune(self, conn):
+        """Drop expired rows and the least recently used rows beyond max_entries"""
+        conn.execute("DELETE FROM da_cache WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        cursor = conn.execute(
+            "DELETE FROM da_cache WHERE namespace = ? AND key NOT IN ("
+            " SELECT key FROM da_cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+        self.evictions += max(cursor.rowcount, 0)
+
+    def update(self, key, func):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM da_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row is None or time.time() > row[1]:
+                    conn.execute("COMMIT")
+                    return False
+                conn.execute(
+                    "UPDATE da_cache SET value = ? WHERE namespace = ? AND key = ?",
+                    (json.dumps(func(json.loads(row[0]))), self.namespace, key)
+                )
+                conn.execute("COMMIT")
+                return True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM da_cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM da_cache WHERE namespace = ?", (self.namespace,))
+
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM da_cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+
+class RedisBackend:
+    """Redis-protocol (RESP) store shared by every worker; entry count is left to the server's maxmemory policy"""
+
+    shared = True
+
+    def __init__(self, namespace, max_entries, url=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.evictions = 0
+        parsed = urllib.parse.urlparse(url or Config.DA_CACHE_BACKEND)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = urllib.parse.unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    # ----- minimal RESP client -----
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._pid != os.getpid():
+            sock = socket.create_connection((self.host, self.port), timeout=Config.DA_CONNECT_TIMEOUT)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+            self._pid = os.getpid()
+            if self.password:
+                self._command('AUTH', self.password)
+            if self.db:
+                self._command('SELECT', self.db)
+        return conn
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RuntimeError(f"Redis error: {payload.decode()}")
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b'*':
+            count = int(payload)
+            if count < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(count)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    def _command(self, *args):
+        """Send one command and return its decoded reply, reconnecting once on a dropped socket"""
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        for attempt in range(2):
+            sock, reader = self._connection()
+            try:
+                sock.sendall(b''.join(parts))
+                return self._read_reply(reader)
+            except (ConnectionError, OSError):
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    # ----- cache interface -----
+
+    def _key(self, key):
+        return f"da_cache:{self.namespace}:{key}"
+
+    def get(self, key):
+        raw = self._command('GET', self._key(key))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry['v'], entry['t']
+
+    def set(self, key, value, ttl, stored_at=None):
+        stored_at = stored_at or time.time()
+        self._command('SET', self._key(key), json.dumps({'v': value, 't': stored_at}), 'PX', max(int(ttl * 1000), 1))
+
+    def update(self, key, func):
+        """Optimistic WATCH/MULTI/EXEC read-modify-write; falls back to invalidation on contention"""
+        full_key = self._key(key)
+        for _ in range(3):
+            self._command('WATCH', full_key)
+            raw = self._command('GET', full_key)
+            remaining_ms = self._command('PTTL', full_key)
+            if raw is None or remaining_ms is None or remaining_ms <= 0:
+                self._command('UNWATCH')
+                return False
+            entry = json.loads(raw)
+            entry['v'] = func(entry['v'])
+            self._command('MULTI')
+            self._command('SET', full_key, json.dumps(entry), 'PX', remaining_ms)
+            if self._command('EXEC') is not None:
+                return True
+        self.delete(key)
+        return False
+
+    def delete(self, key):
+        self._command('DEL', self._key(key))
+
+    def clear(self):
+        cursor = '0'
+        while True:
+            cursor, keys = self._command('SCAN', cursor, 'MATCH', self._key('*'), 'COUNT', 500)
+            if keys:
+                self._command('DEL', *keys)
+            if cursor == '0':
+                break
+
+    def size(self):
+        count, cursor = 0, '0'
+        while True:
+            cursor, keys = self._command('SCAN', cursor, 'MATCH', self._key('*'), 'COUNT', 500)
+            count += len(keys)
+            if cursor == '0':
+                return count
+
+
+def create_backend(namespace, max_entries):
+    """Build the backend selected by DA_CACHE_BACKEND (memory, sqlite or a redis:// URL)"""
+    choice = (Config.DA_CACHE_BACKEND or 'memory').strip()
+    if choice.startswith(('redis://', 'rediss://')):
+        return RedisBackend(namespace, max_entries, url=choice)
+    if choice == 'sqlite':
+        return SQLiteBackend(namespace, max_entries)
+    return MemoryBackend(namespace, max_entries)
+
+
+class InvalidationLog:
+    """Carries cache changes between processes when the backend is per-process memory
+
+    A write-through in one process (a request worker or the job runner) only reaches its own
+    memory cache. Changed keys are appended to a table in the SQLite cache file, and every
+    process drops the keys changed elsewhere before its next read, at most once per
+    DA_CACHE_SYNC_INTERVAL seconds. Dropped keys are simply fetched again.
+    """
+
+    # Seconds a logged change is kept; longer than any entry lives in a memory cache
+    RETENTION = 86400
+
+    def __init__(self, path=None, interval=None):
+        self.path = path or Config.DA_CACHE_SQLITE_PATH
+        self.interval = Config.DA_CACHE_SYNC_INTERVAL if interval is None else interval
+        self.caches = {}  # cache name -> TTLCache
+        self._cursor = None
+        self._reset()
+
+    def _reset(self):
+        """Start over in a new process: own identity, own connection, fresh lock"""
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._conn = None
+        self._synced_at = 0.0
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS da_cache_invalidations ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, cache TEXT NOT NULL, key TEXT NOT NULL,"
+                " origin TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            if self._cursor is None:
+                # Changes made before this process started cannot be in its caches
+                self._cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM da_cache_invalidations").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def register(self, cache):
+        self.caches[cache.name] = cache
+
+    def publish(self, name, key):
+        """Tell the other processes that key in cache `name` changed"""
+        if self.interval <= 0:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                now = time.time()
+                conn.execute("INSERT INTO da_cache_invalidations (cache, key, origin, created_at) VALUES (?, ?, ?, ?)",
+                             (name, key, self.origin, now))
+                conn.execute("DELETE FROM da_cache_invalidations WHERE created_at < ?", (now - self.RETENTION,))
+        except Exception as e:
+            print(f"Could not publish cache invalidation for {name}: {e}")
+
+    def sync(self):
+        """Drop local entries that other processes changed since the last sync"""
+        if self.interval <= 0 or time.time() - self._synced_at < self.interval:
+            return
+        # Another thread already syncing is as good as syncing ourselves
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            rows = self._connection().execute(
+                "SELECT id, cache, key FROM da_cache_invalidations WHERE id > ? AND origin != ? ORDER BY id",
+                (self._cursor, self.origin)
+            ).fetchall()
+            for row_id, name, key in rows:
+                cache = self.caches.get(name)
+                if cache is not None:
+                    cache.backend.delete(key)
+                self._cursor = row_id
+            self._synced_at = time.time()
+        except Exception as e:
+            print(f"Could not sync cache invalidations: {e}")
+        finally:
+            self._lock.release()
+
+
+invalidation_log = InvalidationLog()
+
+# A forked worker is a new process: it must not share the parent's identity, connection or lock
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=invalidation_log._reset)
+
+
+class TTLCache:
+    """Namespaced cache with per-entry TTL and hit/miss counters over a pluggable backend
+
+    Per-process backends are kept coherent with the other processes through invalidation_log.
+    """
+
+    def __init__(self, name, ttl, max_entries=1024, stale_ttl=0, backend=None, invalidations=None):
+        self.name = name
+        self.ttl = ttl
+        # Entries are kept stale_ttl seconds past ttl so callers may opt in to serving them
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.backend = backend or create_backend(name, max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Shared backends already show every process the same entries
+        self.invalidations = None if self.backend.shared else (invalidations or invalidation_log)
+        if self.invalidations is not None:
+            self.invalidations.register(self)
+
+    @staticmethod
+    def _key(key):
+        """Backends store string keys; tuples are encoded as JSON"""
+        return json.dumps(list(key)) if isinstance(key, tuple) else str(key)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _safe(self, operation, default, *args):
+        """A broken shared backend must degrade to cache misses, not failed requests"""
+        try:
+            return getattr(self.backend, operation)(*args)
+        except Exception as e:
+            print(f"Cache backend error in {self.name}.{operation}: {e}")
+            return default
+
+    def get_entry(self, key, allow_stale=False):
+        """Return (value, stored_at) for key, or None when missing or expired
+
+        With allow_stale, entries older than ttl but inside the stale window are returned too.
+        """
+        if self.invalidations is not None:
+            self.invalidations.sync()
+        entry = self._safe('get', None, self._key(key))
+        if entry is not None and not allow_stale and time.time() - entry[1] > self.ttl:
+            entry = None
+        self._count(entry is not None)
+        return entry
+
+    def get(self, key):
+        """Return the cached value for key, or None when missing or expired"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        """Store value under key"""
+        self._safe('set', None, self._key(key), value, self.ttl + self.stale_ttl)
+
+    def update(self, key, func):
+        """Replace a fresh cached value with func(value); returns False when nothing is cached"""
+        updated = self._safe('update', False, self._key(key), func)
+        self._publish(key)
+        return updated
+
+    def delete(self, key):
+        """Drop a single key (visible to every worker, through invalidation_log for memory backends)"""
+        self._safe('delete', None, self._key(key))
+        self._publish(key)
+
+    def _publish(self, key):
+        # Other processes drop their copy even when this one had nothing cached to update
+        if self.invalidations is not None:
+            self.invalidations.publish(self.name, self._key(key))
+
+    def clear(self):
+        """Drop every entry in this namespace"""
+        self._safe('clear', None)
+
+    def stats(self):
+        """Return counters for sizing the cache"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'name': self.name,
+            'backend': type(self.backend).__name__,
+            'size': self._safe('size', None),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'hits': hits,
+            'misses': misses,
+            'evictions': self.backend.evictions,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0
+        }
@@ -1,12 +1,346 @@
+import contextvars
+import hashlib
+import hmac
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 import requests
 import traceback
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
+from app.config import Config
+from app.da_cache import TTLCache
+from app.forwarder_index import forwarder_index
 
 # Disable SSL warnings for self-signed certificates
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 
+class DeadlineExceeded(Exception):
+    """Raised when the time budget for the current incoming request has run out"""
+
+
+# Absolute time.monotonic() deadline for DirectAdmin calls made by the current request
+_deadline = contextvars.ContextVar('da_deadline', default=None)
+
+
+def set_deadline(seconds):
+    """Start a deadline budget for upstream calls; returns a token for reset_deadline()"""
+    return _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def reset_deadline(token):
+    """Restore the deadline that was active before set_deadline()"""
+    _deadline.reset(token)
+
+
+@contextmanager
+def deadline(seconds):
+    """Limit the total time spent on DirectAdmin calls inside the block"""
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def remaining_budget():
+    """Seconds left in the current deadline, or None when no deadline is active"""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+
+def credential_fingerprint(server, username, password):
+    """Keyed hash of a DirectAdmin login, used in every cache key
+
+    A cached result is only served to callers presenting the same password that fetched it,
+    so knowing another account's server and username is not enough to read its data.
+    """
+    message = '\0'.join((server or '', username or '', password or '')).encode()
+    return hmac.new(Config.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+class SessionRegistry:
+    """Process-wide registry of pooled keep-alive sessions per DirectAdmin login"""
+
+    def __init__(self, pool_size=None, idle_timeout=None):
+        self.pool_size = pool_size or Config.DA_POOL_SIZE
+        self.idle_timeout = idle_timeout or Config.DA_SESSION_IDLE_TIMEOUT
+        self._lock = threading.Lock()
+        self._sessions = {}  # (server, username, credential) -> [session, last_used]
+
+    def _build_session(self):
+        """Create a session whose connection pool keeps sockets alive per host"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'User-Agent': 'DirectAdmin Email Forwarder'})
+        session.verify = False
+        return session
+
+    def _evict_idle(self, now):
+        """Close sessions that have not been used within the idle timeout"""
+        expired = [key for key, entry in self._sessions.items()
+                   if now - entry[1] > self.idle_timeout]
+        for key in expired:
+            session, _ = self._sessions.pop(key)
+            print(f"Closing idle DirectAdmin session for {key[1]}@{key[0]}")
+            session.close()
+
+    def get(self, server, username, credential=None):
+        """Return the shared session for this login, creating it if needed
+
+        Sessions carry cookies, so logins with different passwords never share one.
+        """
+        key = (server, username, credential)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = [self._build_session(), now]
+                self._sessions[key] = entry
+            entry[1] = now
+            return entry[0]
+
+    def close_all(self):
+        """Close every pooled session"""
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def reset(self):
+        """Drop inherited sessions without closing sockets owned by the parent process"""
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+
+session_registry = SessionRegistry()
+
+
+class ServerSlots:
+    """Caps how many bulk write calls run against one DirectAdmin server at the same time"""
+
+    def __init__(self, limit=None):
+        self.limit = limit or Config.DA_SERVER_CONCURRENCY
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    @contextmanager
+    def slot(self, server):
+        with self._lock:
+            semaphore = self._semaphores.get(server)
+            if semaphore is None:
+                semaphore = self._semaphores[server] = threading.BoundedSemaphore(self.limit)
+        with semaphore:
+            yield
+
+
+server_slots = ServerSlots()
+
+# Result caches live in the backend selected by DA_CACHE_BACKEND; with a shared backend
+# (sqlite or redis) write-throughs and invalidations are seen by every gunicorn worker.
+
+# Parsed CMD_API_SHOW_DOMAINS results keyed by (server, DA username, credential fingerprint)
+domain_cache = TTLCache('domains', ttl=Config.DA_DOMAIN_CACHE_TTL, stale_ttl=Config.DA_STALE_TTL)
+
+# Parsed forwarder lists keyed by (server, DA username, domain, credential fingerprint)
+forwarder_cache = TTLCache('forwarders', ttl=Config.DA_FORWARDER_CACHE_TTL,
+                           max_entries=Config.DA_FORWARDER_CACHE_SIZE, stale_ttl=Config.DA_STALE_TTL)
+
+# Parsed email account lists keyed by (server, DA username, domain, credential fingerprint)
+account_cache = TTLCache('email_accounts', ttl=Config.DA_ACCOUNT_CACHE_TTL,
+                         max_entries=Config.DA_FORWARDER_CACHE_SIZE, stale_ttl=Config.DA_STALE_TTL)
+
+# Cache keys with a background refresh currently running (stale-while-revalidate)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def refresh_in_background(key, func):
+    """Run func() on a daemon thread unless a refresh for key is already running"""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+
+    def run():
+        try:
+            func()
+        except Exception as e:
+            print(f"Background refresh of {key} failed: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name='da-refresh', daemon=True).start()
+    return True
+
+
+class SingleFlight:
+    """Coalesces concurrent identical reads so one runs upstream and the others share its result"""
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """Run func() for key, or wait for the identical call already in flight
+
+        A leader that runs out of its own request deadline says nothing about the followers'
+        budgets, so followers with time left try again rather than share that error.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = self._Call()
+                    self.executed += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                break
+            remaining = remaining_budget()
+            if not call.event.wait(timeout=None if remaining is None else max(remaining, 0)):
+                raise DeadlineExceeded("Request deadline exhausted while waiting for a shared DirectAdmin call")
+            if isinstance(call.error, DeadlineExceeded):
+                remaining = remaining_budget()
+                if remaining is None or remaining > 0:
+                    continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        """Return how many reads ran upstream and how many were served by another caller"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced
+            }
+
+
+class EndpointVariantMemory:
+    """Remembers which endpoint variant answers each operation per server, optionally persisted"""
+
+    def __init__(self, persist=None):
+        self.persist = Config.DA_PERSIST_ENDPOINT_VARIANTS if persist is None else persist
+        self._lock = threading.Lock()
+        self._variants = {}  # (server, operation) -> variant id, or None when known-unset
+
+    def _load(self, server, operation):
+        """Look up a remembered variant in the database (requires an app context)"""
+        from flask import has_app_context
+        if not self.persist or not has_app_context():
+            return None
+        try:
+            from app.models import db, EndpointVariant
+            with db.engine.connect() as conn:
+                return conn.execute(
+                    db.select(EndpointVariant.variant).where(
+                        EndpointVariant.server == server,
+                        EndpointVariant.operation == operation
+                    )
+                ).scalar()
+        except Exception as e:
+            print(f"Could not load endpoint variant for {operation} on {server}: {e}")
+            return None
+
+    def _store(self, server, operation, variant):
+        """Upsert (or delete when variant is None) the persisted variant in its own transaction"""
+        from flask import has_app_context
+        if not self.persist or not has_app_context():
+            return
+        try:
+            from app.models import db, EndpointVariant
+            table = EndpointVariant.__table__
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(
+                    table.c.server == server, table.c.operation == operation
+                ))
+                if variant is not None:
+                    conn.execute(table.insert().values(
+                        server=server, operation=operation, variant=variant,
+                        updated_at=datetime.utcnow()
+                    ))
+        except Exception as e:
+            print(f"Could not persist endpoint variant for {operation} on {server}: {e}")
+
+    def get(self, server, operation):
+        """Return the remembered variant id for this server/operation, if any"""
+        key = (server, operation)
+        with self._lock:
+            if key in self._variants:
+                return self._variants[key]
+        variant = self._load(server, operation)
+        with self._lock:
+            self._variants.setdefault(key, variant)
+            return self._variants[key]
+
+    def remember(self, server, operation, variant):
+        """Record the variant that just answered"""
+        with self._lock:
+            if self._variants.get((server, operation)) == variant:
+                return
+            self._variants[(server, operation)] = variant
+        print(f"Remembering {variant} for {operation} on {server}")
+        self._store(server, operation, variant)
+
+    def forget(self, server, operation):
+        """Drop a remembered variant that stopped working so the next call re-probes"""
+        with self._lock:
+            self._variants[(server, operation)] = None
+        print(f"Forgetting endpoint variant for {operation} on {server}")
+        self._store(server, operation, None)
+
+
+variant_memory = EndpointVariantMemory()
+
+# Identical concurrent reads (same login, endpoint, method and params) share one request
+read_flight = SingleFlight('reads')
+
+
+def cache_stats():
+    """Hit/miss counters for every DirectAdmin result cache"""
+    return [domain_cache.stats(), forwarder_cache.stats(), account_cache.stats(), read_flight.stats()]
+
+# Sockets must not be shared between a gunicorn master (--preload) and its workers
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=session_registry.reset)
+
+
 class DirectAdminAPI:
     """DirectAdmin API wrapper for email management"""
 
@@ -16,8 +350,119 @@ class DirectAdminAPI:
         self.username = username
         self.password = password
         self.domain = domain
-
-    def _make_request(self, endpoint, data=None, method='POST'):
+        self.credential = credential_fingerprint(self.server, username, password)
+
+    @property
+    def session(self):
+        """Pooled keep-alive session shared by every instance for this login"""
+        return session_registry.get(self.server, self.username, self.credential)
+
+    @property
+    def account_key(self):
+        """Cache key for results of the DirectAdmin account, bound to the password used"""
+        return (self.server, self.username, self.credential)
+
+    @property
+    def forwarder_key(self):
+        """Identifies this instance's domain (server, DA username, domain), e.g. in the forwarder index"""
+        return (self.server, self.username, self.domain)
+
+    @property
+    def cache_key(self):
+        """Cache key for results of this instance's domain, bound to the password used"""
+        return self.forwarder_key + (self.credential,)
+
+    @staticmethod
+    def invalidate_domain_cache(server, username, password):
+        """Forget the cached domain list for a DirectAdmin login"""
+        if server and username:
+            server = server.rstrip('/')
+            domain_cache.delete((server, username, credential_fingerprint(server, username, password)))
+
+    @staticmethod
+    def _variant_id(endpoint, params, method):
+        """Describe a request variant by its shape (method, endpoint and param names)"""
+        return f"{method} {endpoint}?{','.join(sorted(params))}"
+
+    def _request_variants(self, operation, variants, allow_empty=False):
+        """Try (endpoint, params, method) variants, starting with the one that last worked here
+
+        With allow_empty, an empty 200 answer counts as a valid (empty) response.
+        """
+        remembered = variant_memory.get(self.server, operation)
+        candidates = list(variants)
+
+        def answered(response):
+            return response is not None if allow_empty else bool(response)
+
+        for endpoint, params, method in variants:
+            if self._variant_id(endpoint, params, method) != remembered:
+                continue
+            print(f"\nTrying remembered variant: {remembered}")
+            response = self._read(endpoint, params, method=method, allow_empty=allow_empty)
+            if answered(response):
+                return response
+            variant_memory.forget(self.server, operation)
+            candidates.remove((endpoint, params, method))
+            break
+
+        if Config.DA_PARALLEL_PROBE and len(candidates) > 1:
+            return self._probe_variants_parallel(operation, candidates, answered, allow_empty)
+
+        for endpoint, params, method in candidates:
+            print(f"\nTrying: {method} {endpoint} with params: {params}")
+            response = self._read(endpoint, params, method=method, allow_empty=allow_empty)
+            if answered(response):
+                print(f"Got valid response with {method}")
+                variant_memory.remember(self.server, operation, self._variant_id(endpoint, params, method))
+                return response
+
+        return None
+
+    def _probe_variants_parallel(self, operation, variants, answered=bool, allow_empty=False):
+        """Fire all variants at once and keep the first valid response, ignoring the rest"""
+        print(f"\nProbing {len(variants)} variants for {operation} in parallel")
+        executor = ThreadPoolExecutor(max_workers=len(variants), thread_name_prefix='da-probe')
+        # Each probe runs in a copy of this context so it shares the request deadline
+        futures = {
+            executor.submit(contextvars.copy_context().run, self._read, endpoint, params, method, allow_empty):
+                self._variant_id(endpoint, params, method)
+            for endpoint, params, method in variants
+        }
+        try:
+            for future in as_completed(futures):
+                response = future.result()
+                if answered(response):
+                    print(f"Got valid response from {futures[future]}")
+                    variant_memory.remember(self.server, operation, futures[future])
+                    return response
+            return None
+        finally:
+            # Do not wait for slower variants; their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _timeout(read_timeout=None):
+        """(connect, read) timeouts for one upstream call, capped by the remaining budget"""
+        connect = Config.DA_CONNECT_TIMEOUT
+        read = read_timeout or Config.DA_READ_TIMEOUT
+        remaining = remaining_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("Request deadline exhausted before calling DirectAdmin")
+            connect = min(connect, remaining)
+            read = min(read, remaining)
+        return connect, read
+
+    def _read(self, endpoint, params=None, method='GET', allow_empty=False):
+        """Make a read-only request, coalesced with identical reads already in flight"""
+        # The credential keeps a caller with a different password from sharing the leader's answer
+        key = (self.server, self.username, self.credential, endpoint, method,
+               tuple(sorted((params or {}).items())), allow_empty)
+        return read_flight.do(key, lambda: self._make_request(endpoint, params, method=method,
+                                                              allow_empty=allow_empty))
+
+    def _make_request(self, endpoint, data=None, method='POST', allow_empty=False):
         """Make request to DirectAdmin API with improved parsing"""
         try:
             url = f"{self.server}{endpoint}"
@@ -26,31 +471,25 @@ class DirectAdminAPI:
             if data:
                 print(f"Request data: {data}")
 
-            print(f"Starting HTTP request with 10 second timeout...")
-            
-            # Common headers
-            headers = {
-                'User-Agent': 'DirectAdmin Email Forwarder'
-            }
+            timeout = self._timeout()
+            print(f"Starting HTTP request with {timeout[0]:.1f}s connect / {timeout[1]:.1f}s read timeout...")
 
-            # Make the request
+            # Make the request over the pooled keep-alive session
             if method == 'GET':
-                response = requests.get(
+                response = self.session.get(
                     url,
                     params=data,
                     auth=(self.username, self.password),
                     verify=False,
-                    timeout=10,
-                    headers=headers
+                    timeout=timeout
                 )
             else:
-                response = requests.post(
+                response = self.session.post(
                     url,
                     data=data,
                     auth=(self.username, self.password),
                     verify=False,
-                    timeout=10,
-                    headers=headers
+                    timeout=timeout
                 )
 
             print(f"HTTP request completed successfully!")
@@ -74,8 +513,11 @@ class DirectAdminAPI:
                     print(f"This usually means the API endpoint doesn't exist or authentication failed")
                     return None
 
-                # Check for empty response
+                # Check for empty response; list endpoints answer an empty list with no body at all
                 if not text:
+                    if allow_empty:
+                        print("Empty response from DirectAdmin API (no entries)")
+                        return {}
                     print(f"ERROR: Empty response from DirectAdmin API")
                     return None
 
@@ -145,8 +587,13 @@ class DirectAdminAPI:
                 print(f"Response: {response.text}")
                 return None
 
+        except DeadlineExceeded:
+            raise
         except requests.exceptions.Timeout:
             print("Request timed out")
+            remaining = remaining_budget()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"DirectAdmin did not answer {endpoint} within the request deadline")
             return None
         except Exception as e:
             print(f"Request error: {e}")
@@ -163,19 +610,26 @@ class DirectAdminAPI:
             
             # First try a simple HTTP request test
             print(f"Testing basic HTTP connectivity...")
-            import requests
             test_url = f"{self.server}/CMD_API_SHOW_DOMAINS"
             
             try:
-                basic_response = requests.get(
+                basic_response = self.session.get(
                     test_url,
                     auth=(self.username, self.password),
                     verify=False,
-                    timeout=5  # Shorter timeout for basic test
+                    timeout=self._timeout(5)  # Shorter read timeout for basic test
                 )
                 print(f"Basic HTTP test: status={basic_response.status_code}")
                 if basic_response.status_code != 200:
                     return False, f"HTTP request failed with status {basic_response.status_code}"
+            except DeadlineExceeded:
+                raise
+            except requests.exceptions.Timeout as e:
+                remaining = remaining_budget()
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded("DirectAdmin did not answer the connection test within the request deadline")
+                print(f"Basic HTTP test failed: {e}")
+                return False, f"Basic connectivity test failed: {str(e)}"
             except Exception as e:
                 print(f"Basic HTTP test failed: {e}")
                 return False, f"Basic connectivity test failed: {str(e)}"
@@ -190,16 +644,8 @@ class DirectAdminAPI:
                     # Check if our domain is in the list
                     if self.domain:
                         # DirectAdmin might return domains in various formats
-                        domain_list = []
-                        for key, value in response.items():
-                            if 'domain' in key.lower() or key.startswith('list'):
-                                # Handle case where value is a list (like list[] parameters)
-                                if isinstance(value, list):
-                                    domain_list.extend(value)  # Use extend instead of append to flatten
-                                else:
-                                    domain_list.append(value)
-                            elif '.' in key and not key.startswith('<'):  # Might be domain name as key, but not HTML
-                                domain_list.append(key)
+                        domain_list = self._parse_domain_list(response)
+                        domain_cache.set(self.account_key, sorted(set(domain_list)))
 
                         print(f"Found domains: {domain_list}")
                         domain_count = len(domain_list)
@@ -230,6 +676,8 @@ class DirectAdminAPI:
 
             return False, "Failed to connect. Server returned HTML instead of API data - please check your DirectAdmin URL, credentials, and API access."
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             error_msg = str(e)
             print(f"Connection test exception: {error_msg}")
@@ -245,64 +693,121 @@ class DirectAdminAPI:
             else:
                 return False, f"Connection error: {error_msg}"
 
-    def validate_domain_access(self):
+    @staticmethod
+    def _parse_domain_list(response):
+        """Extract domain names from a CMD_API_SHOW_DOMAINS response"""
+        domain_list = []
+        for key, value in response.items():
+            if 'domain' in key.lower() or key.startswith('list'):
+                # Handle case where value is a list (like list[] parameters)
+                if isinstance(value, list):
+                    domain_list.extend(value)  # Use extend instead of append to flatten
+                else:
+                    domain_list.append(value)
+            elif '.' in key and not key.startswith('<'):  # Might be domain name as key, but not HTML
+                domain_list.append(key)
+        return domain_list
+
+    def get_account_domains(self, refresh=False, allow_stale=False):
+        """Return the set of domains in the DirectAdmin account, cached per account"""
+        if not refresh:
+            entry = domain_cache.get_entry(self.account_key, allow_stale=allow_stale)
+            if entry is not None:
+                if time.time() - entry[1] > domain_cache.ttl:
+                    refresh_in_background(('domains',) + self.account_key,
+                                          lambda: self.get_account_domains(refresh=True))
+                return frozenset(entry[0])
+
+        response = self._read('/CMD_API_SHOW_DOMAINS')
+        if not response or not isinstance(response, dict):
+            return None
+
+        domains = frozenset(self._parse_domain_list(response))
+        print(f"Parsed domain list: {sorted(domains)}")
+        domain_cache.set(self.account_key, sorted(domains))
+        return domains
+
+    def validate_domain_access(self, allow_stale=False):
         """Check if the current domain is accessible via the API"""
         try:
             print(f"\n=== Validating Domain Access for {self.domain} ===")
-            
-            # Try to get domain list to verify access
-            endpoint = '/CMD_API_SHOW_DOMAINS'
-            response = self._make_request(endpoint, method='GET')
-            
-            if response and isinstance(response, dict):
-                domain_list = []
-                for key, value in response.items():
-                    if 'domain' in key.lower() or key.startswith('list'):
-                        # Handle case where value is a list (like list[] parameters)
-                        if isinstance(value, list):
-                            domain_list.extend(value)  # Use extend instead of append to flatten
-                        else:
-                            domain_list.append(value)
-                    elif '.' in key and not key.startswith('<'):  # Might be domain name as key, but not HTML
-                        domain_list.append(key)
-                
-                print(f"Parsed domain list: {domain_list}")
-                
-                if self.domain in domain_list:
+
+            domains = self.get_account_domains(allow_stale=allow_stale)
+            # A cached list may predate a domain added in DirectAdmin, so re-check once
+            if domains is not None and self.domain not in domains:
+                domains = self.get_account_domains(refresh=True)
+
+            if domains is not None:
+                if self.domain in domains:
                     print(f"✓ Domain {self.domain} found in account")
                     return True, f"Domain {self.domain} is accessible"
                 else:
                     print(f"✗ Domain {self.domain} not found in account")
-                    print(f"Available domains: {domain_list}")
+                    print(f"Available domains: {sorted(domains)}")
                     return False, f"Domain {self.domain} not found in DirectAdmin account"
             
             print("Could not verify domain access - no domain list returned")
             return False, "Unable to verify domain access"
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             import traceback
             print(f"Error validating domain access: {e}")
             traceback.print_exc()
             return False, "An internal error occurred while validating domain access."
 
-    def get_email_accounts(self):
-        """Get all email accounts for the domain"""
+    def get_email_accounts(self, refresh=False):
+        """Get all email accounts for the domain, served from cache when fresh"""
+        if not refresh:
+            cached = account_cache.get(self.cache_key)
+            if cached is not None:
+                return list(cached)
+
+        accounts = self._fetch_email_accounts()
+        if accounts is not None:
+            account_cache.set(self.cache_key, list(accounts))
+            return accounts
+        return []
+
+    def _stale_while_revalidate(self, cache, loader):
+        """Return (value, age, stale) at once, refreshing stale entries on a background thread"""
+        entry = cache.get_entry(self.cache_key, allow_stale=True)
+        if entry is None:
+            return loader(refresh=True), 0.0, False
+
+        value, stored_at = entry
+        age = max(time.time() - stored_at, 0.0)
+        if age <= cache.ttl:
+            return value, age, False
+
+        refresh_in_background((cache.name,) + self.cache_key, lambda: loader(refresh=True))
+        return value, age, True
+
+    def get_forwarders_swr(self):
+        """Forwarders plus their age, served stale while a background refresh runs"""
+        forwarders, age, stale = self._stale_while_revalidate(forwarder_cache, self.get_forwarders)
+        return [dict(f) for f in forwarders], age, stale
+
+    def get_email_accounts_swr(self):
+        """Email accounts plus their age, served stale while a background refresh runs"""
+        accounts, age, stale = self._stale_while_revalidate(account_cache, self.get_email_accounts)
+        return list(accounts), age, stale
+
+    def _fetch_email_accounts(self):
+        """Fetch and parse email accounts from DirectAdmin; returns None if no endpoint answered"""
         try:
             print(f"\n=== Getting Email Accounts for {self.domain} ===")
 
             # Try API endpoints only
-            endpoints = [
-                ('/CMD_API_POP', {'action': 'list', 'domain': self.domain}),
-                ('/CMD_API_POP', {'domain': self.domain}),
-                ('/CMD_API_EMAIL_POP', {'domain': self.domain}),
+            variants = [
+                ('/CMD_API_POP', {'action': 'list', 'domain': self.domain}, 'GET'),
+                ('/CMD_API_POP', {'domain': self.domain}, 'GET'),
+                ('/CMD_API_EMAIL_POP', {'domain': self.domain}, 'GET'),
             ]
 
-            response = None
-            for endpoint, params in endpoints:
-                print(f"Trying endpoint: {endpoint}")
-                response = self._make_request(endpoint, params, method='GET')
-                if response:
-                    break
+            # A domain without mailboxes gets a 200 with an empty body
+            response = self._request_variants('email_accounts', variants, allow_empty=True)
 
             if response is None:
                 print("No valid response from any email accounts endpoint")
@@ -310,7 +815,7 @@ class DirectAdminAPI:
                 print("- The domain doesn't exist in DirectAdmin")
                 print("- API user doesn't have permission for this domain")
                 print("- DirectAdmin API is not properly configured")
-                return []
+                return None
 
             print(f"Raw response type: {type(response)}")
             print(f"Raw response: {response}")
@@ -408,38 +913,67 @@ class DirectAdminAPI:
                 print(f"  - {account}")
             return sorted(filtered)
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"ERROR in get_email_accounts: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return None
 
-    def get_forwarders(self):
-        """Get all email forwarders for the domain"""
+    def get_forwarders(self, refresh=False):
+        """Get all email forwarders for the domain, served from cache when fresh"""
+        forwarders = self.load_forwarders(refresh=refresh)
+        return forwarders if forwarders is not None else []
+
+    def load_forwarders(self, refresh=False):
+        """Like get_forwarders(), but None when the panel did not answer instead of an empty list"""
+        if not refresh:
+            cached = forwarder_cache.get(self.cache_key)
+            if cached is not None:
+                print(f"Forwarder cache hit for {self.domain} ({len(cached)} forwarders)")
+                return [dict(f) for f in cached]
+
+        return self.refresh_forwarders()
+
+    def refresh_forwarders(self):
+        """Fetch forwarders upstream and store them in the cache; None when the panel did not answer"""
+        forwarders = self._fetch_forwarders()
+        if forwarders is not None:
+            forwarder_cache.set(self.cache_key, [dict(f) for f in forwarders])
+            forwarder_index.replace(self.forwarder_key, forwarders)
+        return forwarders
+
+    def _cache_forwarder_added(self, address, destination):
+        """Write a successful create through to the cached forwarder list"""
+        def apply(forwarders):
+            updated = [f for f in forwarders if f['address'] != address]
+            updated.append({'address': address, 'destination': destination})
+            return updated
+        forwarder_cache.update(self.cache_key, apply)
+        forwarder_index.add(self.forwarder_key, address, destination)
+
+    def _cache_forwarder_removed(self, address):
+        """Write a successful delete through to the cached forwarder list"""
+        forwarder_cache.update(
+            self.cache_key,
+            lambda forwarders: [f for f in forwarders if f['address'] != address]
+        )
+        forwarder_index.remove(self.forwarder_key, address)
+
+    def _fetch_forwarders(self):
+        """Fetch and parse forwarders from DirectAdmin; returns None if no endpoint answered"""
         try:
             print(f"\n=== Getting Forwarders for {self.domain} ===")
 
-            # Try API endpoints only (avoid web interface endpoints)
-            endpoints = [
-                ('/CMD_API_EMAIL_FORWARDERS', {'domain': self.domain, 'action': 'list'}),
-                ('/CMD_API_EMAIL_FORWARDERS', {'domain': self.domain}),
-            ]
-
-            response = None
-            for endpoint, params in endpoints:
-                print(f"\nTrying: {endpoint} with params: {params}")
+            # Try API endpoints only (avoid web interface endpoints), GET before POST
+            variants = []
+            for params in ({'domain': self.domain, 'action': 'list'}, {'domain': self.domain}):
+                variants.append(('/CMD_API_EMAIL_FORWARDERS', params, 'GET'))
+                variants.append(('/CMD_API_EMAIL_FORWARDERS', params, 'POST'))
 
-                # Try GET first
-                response = self._make_request(endpoint, params, method='GET')
-                if response:
-                    print(f"Got valid response with GET")
-                    break
-
-                # Try POST
-                response = self._make_request(endpoint, params, method='POST')
-                if response:
-                    print(f"Got valid response with POST")
-                    break
+            # A domain without forwarders gets a 200 with an empty body
+            response = self._request_variants('forwarders', variants, allow_empty=True)
 
             if response is None:
                 print("ERROR: No valid response from any API endpoint!")
@@ -447,7 +981,7 @@ class DirectAdminAPI:
                 print("- The domain doesn't exist in DirectAdmin")
                 print("- API user doesn't have permission for this domain")
                 print("- DirectAdmin API is not properly configured")
-                return []
+                return None
 
             print(f"\n=== FORWARDERS RAW RESPONSE ===")
             print(f"Type: {type(response)}")
@@ -540,11 +1074,45 @@ class DirectAdminAPI:
 
             return forwarders
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"ERROR in get_forwarders: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return None
+
+    def normalize_destination(self, destination):
+        """Apply the forwarder destination rules; returns (destination, error message or None)
+
+        1. If it starts with : (like :blackhole:, :fail:), it's a special destination
+        2. If it starts with | (pipe to script), it's a special destination
+        3. Otherwise it is a comma-separated list, and each entry is checked on its own:
+           a. If it has @, it's already a full email address
+           b. Otherwise, assume it's a local username and add domain
+        """
+        import re
+        destination = (destination or '').strip()
+        if not destination:
+            return destination, "Destination email is required"
+        if destination.startswith(':') or destination.startswith('|'):
+            return destination, None
+
+        parts = []
+        for part in destination.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '@' not in part:
+                if not re.match(r'^[a-zA-Z0-9._%+-]+$', part):
+                    return destination, f"Invalid destination: {part}"
+                part = f"{part}@{self.domain}"
+            if not self.validate_email(part):
+                return destination, f"Invalid destination: {part}"
+            parts.append(part)
+        if not parts:
+            return destination, "Destination email is required"
+        return ','.join(parts), None
 
     def create_forwarder(self, address, destination):
         """Create an email forwarder"""
@@ -555,20 +1123,10 @@ class DirectAdminAPI:
             else:
                 username = address
 
-            # SMART DESTINATION HANDLING:
-            # 1. If it has @, it's already a full email address
-            # 2. If it starts with : (like :blackhole:, :fail:), it's a special destination
-            # 3. If it starts with | (pipe to script), it's a special destination
-            # 4. Otherwise, assume it's a local username and add domain
-
-            if '@' not in destination:
-                # Check if it's a special destination
-                if destination.startswith(':') or destination.startswith('|'):
-                    # Special destination - use as-is
-                    print(f"Special destination detected: {destination}")
-                else:
-                    # Regular username - add domain
-                    destination = f"{destination}@{self.domain}"
+            # SMART DESTINATION HANDLING (see normalize_destination)
+            destination, error = self.normalize_destination(destination)
+            if error:
+                return False, error
 
             print(f"\n=== Creating Forwarder ===")
             print(f"Username: {username}")
@@ -597,6 +1155,7 @@ class DirectAdminAPI:
 
                     # error=0 means SUCCESS!
                     if error_code == '0' or error_code == 0:
+                        self._cache_forwarder_added(f"{username}@{self.domain}", destination)
                         return True, f"Forwarder {username}@{self.domain} → {destination} created successfully"
 
                     # Non-zero error code means actual error
@@ -612,10 +1171,13 @@ class DirectAdminAPI:
 
                 elif isinstance(response, str):
                     if 'error' not in response.lower():
+                        self._cache_forwarder_added(f"{username}@{self.domain}", destination)
                         return True, f"Forwarder {username}@{self.domain} → {destination} created"
 
             return False, "Failed to create forwarder. No response from server."
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error creating forwarder: {e}")
             import traceback
@@ -652,6 +1214,7 @@ class DirectAdminAPI:
 
                     # error=0 means SUCCESS!
                     if error_code == '0' or error_code == 0:
+                        self._cache_forwarder_removed(address)
                         return True, f"Forwarder {address} deleted successfully"
 
                     # Non-zero error code means actual error
@@ -667,14 +1230,63 @@ class DirectAdminAPI:
 
                 elif isinstance(response, str):
                     if 'error' not in response.lower():
+                        self._cache_forwarder_removed(address)
                         return True, f"Forwarder {address} deleted"
 
             return False, "Failed to delete forwarder"
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error deleting forwarder: {e}")
             return False, "An error occurred while deleting the forwarder"
 
+    def delete_forwarders(self, addresses, chunk_size=None):
+        """Delete many forwarders of this domain with one select0..selectN call per chunk
+
+        Returns {address: (success, message)}. A chunk the panel rejects is retried one
+        address at a time so every address gets its own result.
+        """
+        chunk_size = chunk_size or Config.DA_BATCH_DELETE_SIZE
+        addresses = [a if '@' in a else f"{a}@{self.domain}" for a in addresses]
+        results = {}
+
+        for start in range(0, len(addresses), chunk_size):
+            chunk = addresses[start:start + chunk_size]
+            if len(chunk) == 1:
+                results[chunk[0]] = self.delete_forwarder(chunk[0])
+                continue
+
+            data = {'domain': self.domain, 'action': 'delete'}
+            for i, address in enumerate(chunk):
+                data[f'select{i}'] = address.split('@')[0]
+
+            print(f"\n=== Deleting {len(chunk)} Forwarders on {self.domain} ===")
+            try:
+                response = self._make_request('/CMD_API_EMAIL_FORWARDERS', data)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                print(f"Error deleting forwarders: {e}")
+                response = None
+
+            ok = False
+            if isinstance(response, dict):
+                ok = str(response.get('error', '1')) == '0'
+            elif isinstance(response, str):
+                ok = 'error' not in response.lower()
+
+            if ok:
+                for address in chunk:
+                    self._cache_forwarder_removed(address)
+                    results[address] = (True, f"Forwarder {address} deleted")
+            else:
+                print(f"Batch delete rejected, retrying {len(chunk)} forwarders one by one")
+                for address in chunk:
+                    results[address] = self.delete_forwarder(address)
+
+        return results
+
     def validate_email(self, email):
         """Basic email validation"""
         import re
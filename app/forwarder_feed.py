@@ -0,0 +1,207 @@
+import base64
+import hashlib
+import json
+import queue
+import threading
+from app.config import Config
+from app.da_cache import TTLCache
+
+# Forwarder lists by version, so clients holding an older version can be sent only the changes
+snapshot_cache = TTLCache('forwarder_snapshots', ttl=Config.DA_SNAPSHOT_TTL,
+                          max_entries=Config.DA_SNAPSHOT_CACHE_SIZE)
+
+
+def forwarders_version(forwarders):
+    """Content hash of a forwarder list, independent of ordering"""
+    pairs = sorted((f['address'], f['destination']) for f in forwarders)
+    return hashlib.sha256(json.dumps(pairs).encode()).hexdigest()[:16]
+
+
+def forwarder_delta(key, forwarders, since=None):
+    """Record the current snapshot and diff it against version `since`
+
+    Returns (version, added, removed); added/removed are None when `since` is unknown or expired.
+    """
+    pairs = sorted({(f['address'], f['destination']) for f in forwarders})
+    version = forwarders_version(forwarders)
+    snapshot_cache.set(key + (version,), [list(p) for p in pairs])
+
+    if not since:
+        return version, None, None
+    if since == version:
+        return version, [], []
+
+    previous = snapshot_cache.get(key + (since,))
+    if previous is None:
+        return version, None, None
+
+    previous = {tuple(p) for p in previous}
+    current = set(pairs)
+    added = [{'address': a, 'destination': d} for a, d in sorted(current - previous)]
+    removed = [{'address': a, 'destination': d} for a, d in sorted(previous - current)]
+    return version, added, removed
+
+
+# Orderings accepted by page_forwarders(); a leading '-' reverses them
+SORT_FIELDS = {
+    'address': ('address', 'destination'),
+    'destination': ('destination', 'address')
+}
+
+
+def _encode_cursor(sort_key):
+    return base64.urlsafe_b64encode(json.dumps(sort_key).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(sort_key, list) or len(sort_key) != 2:
+        raise ValueError('Invalid cursor')
+    return tuple(sort_key)
+
+
+def page_forwarders(forwarders, q=None, sort='address', cursor=None, limit=None):
+    """Filter, sort and slice a forwarder list
+
+    q matches a case-insensitive substring of the address or destination. The cursor is
+    the sort key of the last row already seen, so pages stay consistent while forwarders
+    are added or removed in between. Returns (page, total, next_cursor); raises ValueError
+    for an unknown sort or a malformed cursor.
+    """
+    descending = sort.startswith('-')
+    fields = SORT_FIELDS.get(sort.lstrip('-'))
+    if fields is None:
+        raise ValueError(f"Unknown sort '{sort}'")
+
+    if q:
+        needle = q.lower()
+        forwarders = [f for f in forwarders
+                      if needle in f['address'].lower() or needle in f['destination'].lower()]
+
+    def sort_key(forwarder):
+        return (forwarder[fields[0]].lower(), forwarder[fields[1]].lower())
+
+    rows = sorted(forwarders, key=sort_key, reverse=descending)
+    total = len(rows)
+
+    if cursor:
+        after = _decode_cursor(cursor)
+        if descending:
+            rows = [f for f in rows if sort_key(f) < after]
+        else:
+            rows = [f for f in rows if sort_key(f) > after]
+
+    if limit is None or len(rows) <= limit:
+        return rows, total, None
+    page = rows[:limit]
+    return page, total, _encode_cursor(sort_key(page[-1]))
+
+
+class _Topic:
+    """Watchers of one domain under one DirectAdmin login, and the refresher thread serving them"""
+
+    def __init__(self, api):
+        self.api = api
+        self.watchers = set()
+        self.last_event = None
+        self.stop = threading.Event()
+        self.thread = None
+
+
+class ForwarderFeed:
+    """Shares one upstream refresh loop per domain between every open change stream"""
+
+    def __init__(self, interval=None, max_clients=None):
+        self.interval = interval or Config.DA_STREAM_INTERVAL
+        self.max_clients = max_clients if max_clients is not None else Config.DA_STREAM_MAX_CLIENTS
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._clients = 0
+
+    def subscribe(self, api):
+        """Register a watcher for api's domain; returns (key, queue) or None when at capacity
+
+        Topics are keyed by api.cache_key, so only watchers with the same credentials share
+        a refresher and its events.
+        """
+        key = api.cache_key
+        watcher = queue.Queue(maxsize=10)
+        with self._lock:
+            if self._clients >= self.max_clients:
+                return None
+            self._clients += 1
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic(api)
+                topic.thread = threading.Thread(target=self._run, args=(key, topic),
+                                                name='da-feed', daemon=True)
+                topic.thread.start()
+            topic.watchers.add(watcher)
+            # New watchers start from the latest known list without waiting for the next refresh
+            if topic.last_event is not None:
+                watcher.put_nowait(topic.last_event)
+        return key, watcher
+
+    def unsubscribe(self, subscription):
+        """Remove a watcher; the refresher stops once its domain has none left"""
+        key, watcher = subscription
+        with self._lock:
+            self._clients -= 1
+            topic = self._topics.get(key)
+            if topic is None:
+                return
+            topic.watchers.discard(watcher)
+            if not topic.watchers:
+                del self._topics[key]
+                topic.stop.set()
+
+    def _run(self, key, topic):
+        """Refresh the domain once per interval and push only when the list changed"""
+        print(f"Starting forwarder feed for {key[2]}")
+        while not topic.stop.is_set():
+            try:
+                forwarders = topic.api.refresh_forwarders()
+                if forwarders is not None:
+                    version = forwarder_delta(key, forwarders)[0]
+                    if topic.last_event is None or topic.last_event['version'] != version:
+                        self._publish(topic, {
+                            'domain': key[2],
+                            'version': version,
+                            'forwarders': forwarders
+                        })
+            except Exception as e:
+                print(f"Forwarder feed refresh for {key[2]} failed: {e}")
+            topic.stop.wait(self.interval)
+        print(f"Stopped forwarder feed for {key[2]}")
+
+    def _publish(self, topic, event):
+        with self._lock:
+            topic.last_event = event
+            watchers = list(topic.watchers)
+        for watcher in watchers:
+            try:
+                watcher.put_nowait(event)
+            except queue.Full:
+                # A stalled client only ever needs the newest list
+                try:
+                    watcher.get_nowait()
+                    watcher.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': 'forwarder_feed',
+                'domains': len(self._topics),
+                'clients': self._clients,
+                'max_clients': self.max_clients,
+                'interval': self.interval
+            }
+
+
+forwarder_feed = ForwarderFeed()
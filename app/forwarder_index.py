@@ -0,0 +1,146 @@
+import threading
+from datetime import datetime
+from flask import has_app_context
+from app.forwarder_feed import forwarders_version
+
+# Upper bound on a search prefix range; sorts after any character an address can contain
+_PREFIX_END = '\uffff'
+
+
+def _rows(forwarders):
+    """Split forwarders into (alias, destination) rows, one per destination"""
+    rows = set()
+    for forwarder in forwarders:
+        alias = forwarder['address'].split('@', 1)[0].strip().lower()
+        for destination in forwarder['destination'].split(','):
+            destination = destination.strip().lower()
+            if alias and destination:
+                rows.add((alias, destination))
+    return rows
+
+
+class ForwarderIndex:
+    """Local reverse index of forwarders, kept in the database and refreshed from panel reads
+
+    Writes come from request threads as well as background refreshers, so the app is kept
+    to open a context where none is active.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._versions = {}  # (server, da_username, domain) -> last indexed version
+
+    def init_app(self, app):
+        self.app = app
+
+    def _run(self, action, func):
+        """Run func() inside an app context, logging instead of raising on failure"""
+        try:
+            if has_app_context():
+                return func()
+            if self.app is None:
+                return None
+            with self.app.app_context():
+                return func()
+        except Exception as e:
+            print(f"Forwarder index {action} failed: {e}")
+            return None
+
+    def replace(self, key, forwarders):
+        """Index the full forwarder list of one domain; a no-op when that version is already indexed"""
+        version = forwarders_version(forwarders)
+        with self._lock:
+            if self._versions.get(key) == version:
+                return
+
+        def write():
+            from app.models import db, ForwarderIndexEntry, ForwarderIndexState
+            server, da_username, domain = key
+            entries = ForwarderIndexEntry.__table__
+            states = ForwarderIndexState.__table__
+            rows = [{'server': server, 'da_username': da_username, 'domain': domain,
+                     'alias': alias, 'destination': destination}
+                    for alias, destination in sorted(_rows(forwarders))]
+            with db.engine.begin() as conn:
+                conn.execute(entries.delete().where(
+                    entries.c.server == server, entries.c.da_username == da_username, entries.c.domain == domain
+                ))
+                if rows:
+                    conn.execute(entries.insert(), rows)
+                conn.execute(states.delete().where(
+                    states.c.server == server, states.c.da_username == da_username, states.c.domain == domain
+                ))
+                conn.execute(states.insert().values(
+                    server=server, da_username=da_username, domain=domain,
+                    version=version, indexed_at=datetime.utcnow()
+                ))
+            with self._lock:
+                self._versions[key] = version
+            print(f"Indexed {len(rows)} forwarder rows for {domain}")
+
+        self._run('refresh', write)
+
+    def add(self, key, address, destination):
+        """Write a created forwarder through to the index"""
+        self._change(key, address, [{'address': address, 'destination': destination}])
+
+    def remove(self, key, address):
+        """Write a deleted forwarder through to the index"""
+        self._change(key, address, [])
+
+    def _change(self, key, address, forwarders):
+        def write():
+            from app.models import db, ForwarderIndexEntry, ForwarderIndexState
+            server, da_username, domain = key
+            entries = ForwarderIndexEntry.__table__
+            states = ForwarderIndexState.__table__
+            alias = address.split('@', 1)[0].strip().lower()
+            rows = [{'server': server, 'da_username': da_username, 'domain': domain,
+                     'alias': a, 'destination': d} for a, d in sorted(_rows(forwarders))]
+            with db.engine.begin() as conn:
+                conn.execute(entries.delete().where(
+                    entries.c.server == server, entries.c.da_username == da_username,
+                    entries.c.domain == domain, entries.c.alias == alias
+                ))
+                if rows:
+                    conn.execute(entries.insert(), rows)
+                # The stored version no longer describes the rows; the next full read rewrites them
+                conn.execute(states.update().where(
+                    states.c.server == server, states.c.da_username == da_username, states.c.domain == domain
+                ).values(version=None))
+            with self._lock:
+                self._versions.pop(key, None)
+
+        self._run('update', write)
+
+    def search(self, server, da_username, domains, term, field='destination', exact=False, limit=100):
+        """Look up forwarders by destination or alias across the given domains
+
+        Returns (results, indexed_domains). Exact and prefix matches both use the column indexes.
+        """
+        from app.models import db, ForwarderIndexEntry, ForwarderIndexState
+        column = ForwarderIndexEntry.alias if field == 'alias' else ForwarderIndexEntry.destination
+        term = term.strip().lower()
+        if field == 'alias':
+            term = term.split('@', 1)[0]
+        match = column == term if exact else db.and_(column >= term, column < term + _PREFIX_END)
+
+        entries = ForwarderIndexEntry.query.filter(
+            ForwarderIndexEntry.server == server,
+            ForwarderIndexEntry.da_username == da_username,
+            ForwarderIndexEntry.domain.in_(domains),
+            match
+        ).order_by(column, ForwarderIndexEntry.domain, ForwarderIndexEntry.alias).limit(limit).all()
+
+        indexed = db.session.execute(
+            db.select(ForwarderIndexState.domain).where(
+                ForwarderIndexState.server == server,
+                ForwarderIndexState.da_username == da_username,
+                ForwarderIndexState.domain.in_(domains)
+            )
+        ).scalars().all()
+        return [entry.to_dict() for entry in entries], set(indexed)
+
+
+forwarder_index = ForwarderIndex()
@@ -0,0 +1,29 @@
+# Gunicorn hooks, loaded with --config python:app.gunicorn_conf (see Dockerfile)
+import os
+import subprocess
+import sys
+
+_runner = None
+
+
+def when_ready(server):
+    """Start the background job runner once, next to the request workers
+
+    Jobs get their own process rather than threads in the master, which forks request workers
+    at any time. Request workers inherit DA_JOB_RUNNER and only enqueue.
+    """
+    global _runner
+    _runner = subprocess.Popen([sys.executable, '-m', 'app.job_runner'])
+    os.environ['DA_JOB_RUNNER'] = str(_runner.pid)
+    server.log.info(f"Background job runner started as process {_runner.pid}")
+
+
+def on_exit(server):
+    """Stop the job runner with gunicorn; interrupted jobs are requeued on the next start"""
+    if _runner is None or _runner.poll() is not None:
+        return
+    _runner.terminate()
+    try:
+        _runner.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        _runner.kill()
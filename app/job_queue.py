@@ -0,0 +1,267 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from app.config import Config
+
+
+class JobContext:
+    """Handed to job handlers so they can report progress while they run"""
+
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.id = job['id']
+        self.user_id = job['user_id']
+        self.attempts = job['attempts']
+        self.total = job['total']
+        self.done = 0
+
+    def set_total(self, total):
+        self.total = total
+        self.queue._update(self.id, total=total)
+
+    def advance(self, count=1):
+        self.done += count
+        self.queue._update(self.id, done=self.done)
+
+
+class JobQueue:
+    """Persistent job queue in a WAL-mode SQLite file under DATA_DIR
+
+    Any process may enqueue. Jobs are claimed atomically, so it is safe for more than one
+    process to run workers, but under gunicorn they run in a single job runner process (see
+    app/job_runner.py) and the request workers only enqueue. A handler that raises is
+    retried with exponential backoff until max_attempts; per-item failures belong in its result.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.DA_JOB_DB_PATH
+        self.app = None
+        self.handlers = {}
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def init_app(self, app):
+        self.app = app
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, user_id INTEGER, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+                " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,"
+                " run_at REAL NOT NULL, total INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0,"
+                " owner INTEGER, result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_user ON jobs (user_id, created_at)")
+
+    def _connect(self):
+        """Per-thread connection; connections are never reused across a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._pid = os.getpid()
+        return conn
+
+    def handler(self, kind):
+        """Register the function that runs jobs of this kind: func(ctx, payload) -> result"""
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    # ----- Producers -----
+
+    def enqueue(self, kind, payload, user_id=None, total=0, max_attempts=None):
+        """Store a job and return its id; workers pick it up within DA_JOB_POLL_INTERVAL"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, user_id, kind, payload, status, max_attempts, run_at, total, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, user_id, kind, json.dumps(payload), max_attempts or Config.DA_JOB_MAX_ATTEMPTS,
+             now, total, now, now)
+        )
+        print(f"Queued {kind} job {job_id}")
+        # Outside gunicorn, or when its job runner has died, nothing else runs the queue, so this process does
+        if not self._runner_alive():
+            self.start()
+        self._wake.set()
+        return job_id
+
+    @staticmethod
+    def _runner_alive():
+        """Whether the process named by DA_JOB_RUNNER (see app/job_runner.py) is still running"""
+        pid = os.environ.get('DA_JOB_RUNNER')
+        if not pid:
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, ValueError):
+            pass
+        return True
+
+    def get(self, job_id, user_id=None):
+        """The job as a dict, or None if it does not exist or belongs to someone else"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (user_id is not None and row['user_id'] != user_id):
+            return None
+        return self._to_dict(row)
+
+    def list(self, user_id, limit=20):
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+        ).fetchall()
+        return [self._to_dict(row, with_result=False) for row in rows]
+
+    @staticmethod
+    def _to_dict(row, with_result=True):
+        job = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts'],
+            'total': row['total'],
+            'done': row['done'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'retry_at': row['run_at'] if row['status'] == 'queued' and row['attempts'] else None
+        }
+        if with_result:
+            job['result'] = json.loads(row['result']) if row['result'] else None
+        return job
+
+    # ----- Workers -----
+
+    def start(self, workers=None):
+        """Start the worker threads of this process (once); returns False without an app"""
+        if self.app is None:
+            return False
+        with self._lock:
+            if self._threads:
+                return True
+            self._recover()
+            for i in range(workers or Config.DA_JOB_WORKERS):
+                thread = threading.Thread(target=self._work, name=f'da-job-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"Started {len(self._threads)} job workers in process {os.getpid()}")
+        return True
+
+    def _recover(self):
+        """Requeue jobs left running by a process that no longer exists (DATA_DIR is host-local)"""
+        conn = self._connect()
+        requeued = 0
+        for row in conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall():
+            # Our own pid can only be a previous run (containers restart as pid 1): no worker of ours runs yet
+            if row['owner'] != os.getpid():
+                try:
+                    os.kill(row['owner'], 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except (PermissionError, TypeError):
+                    continue
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), row['id'])
+            )
+            requeued += 1
+        if requeued:
+            print(f"Requeued {requeued} interrupted jobs")
+
+    def _claim(self):
+        """Atomically move the next due job to running"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND run_at <= ? ORDER BY run_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, updated_at = ? WHERE id = ?",
+                    (os.getpid(), now, row['id'])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = dict(row)
+        job['attempts'] += 1
+        return job
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        self._connect().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _work(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Job queue unavailable: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(Config.DA_JOB_POLL_INTERVAL)
+                self._wake.clear()
+                self._purge()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self._update(job['id'], status='failed', error=f"Unknown job kind {job['kind']}")
+            return
+
+        print(f"Running {job['kind']} job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+        try:
+            with self.app.app_context():
+                result = handler(JobContext(self, job), json.loads(job['payload']))
+            self._update(job['id'], status='done', result=json.dumps(result), error=None)
+            print(f"Finished {job['kind']} job {job['id']}")
+        except Exception as e:
+            print(f"{job['kind']} job {job['id']} failed: {e}")
+            if job['attempts'] < job['max_attempts']:
+                delay = min(Config.DA_JOB_RETRY_BASE * 2 ** (job['attempts'] - 1), Config.DA_JOB_RETRY_MAX)
+                self._update(job['id'], status='queued', run_at=time.time() + delay, error=str(e))
+                print(f"Retrying job {job['id']} in {delay:.0f}s")
+            else:
+                self._update(job['id'], status='failed', error=str(e))
+
+    def _purge(self):
+        """Forget finished jobs once they are older than DA_JOB_TTL"""
+        try:
+            self._connect().execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - Config.DA_JOB_TTL,)
+            )
+        except Exception as e:
+            print(f"Could not purge old jobs: {e}")
+
+
+job_queue = JobQueue()
+
+# Workers forked by gunicorn must not inherit the master's worker threads or their locks
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=job_queue._reset_state)
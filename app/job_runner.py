@@ -0,0 +1,33 @@
+"""Background job runner process, started by the gunicorn master (see app/gunicorn_conf.py)
+
+    python -m app.job_runner
+
+Jobs run here and not in the master, so request workers are never forked from a process
+whose job threads hold locks, semaphore slots or in-flight reads.
+"""
+import os
+import signal
+import threading
+
+
+def main():
+    from app.main import create_app
+    from app.job_queue import job_queue
+
+    parent = os.getppid()
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+
+    app = create_app()
+    job_queue.start()
+    print(f"Job runner {os.getpid()} ready")
+    # Exit with gunicorn, even when it could not tell us to
+    while not stop.wait(5):
+        if os.getppid() != parent:
+            print("Job runner lost its gunicorn master; exiting")
+            break
+
+
+if __name__ == '__main__':
+    main()
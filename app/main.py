@@ -1,9 +1,46 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, g, current_app, Response
 from flask_login import LoginManager, login_required, current_user
-from app.models import db, User
+from sqlalchemy.orm import joinedload
+from flask.cli import AppGroup
+import click
+from app.models import db, User, configure_engine
 from app.config import Config
-from app.directadmin_api import DirectAdminAPI
+from app.directadmin_api import DirectAdminAPI, DeadlineExceeded, set_deadline, reset_deadline
+from app.forwarder_feed import forwarder_feed, forwarder_delta, page_forwarders
+from app.forwarder_index import forwarder_index
+from app.bulk_operations import (iter_domain_forwarders, parse_import, load_desired_state, plan_sync, apply_sync,
+                                 MAX_JOB_ERRORS)
+from app.job_queue import job_queue
 import traceback
+import hashlib
+import json
+import contextvars
+import csv
+import io
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def _flag(value):
+    """Interpret a query-string flag such as ?allow_stale=1"""
+    return (value or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _conditional_json(payload, volatile=('age',)):
+    """JSON response with a strong ETag over its content, answering If-None-Match with 304
+
+    Keys listed in volatile (such as the cache age) change on every call without the data
+    changing, so they are left out of the hash.
+    """
+    stable = {k: v for k, v in payload.items() if k not in volatile}
+    etag = hashlib.sha256(json.dumps(stable, sort_keys=True, default=str).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 def create_app():
     """Create and configure the Flask application"""
@@ -16,6 +53,10 @@ def create_app():
 
     # Initialize database
     db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine)
+    forwarder_index.init_app(app)
+    job_queue.init_app(app)
 
     # Initialize login manager
     login_manager = LoginManager()
@@ -25,7 +66,10 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        """Load the user and its ordered domains in one query; Flask-Login keeps it for the request"""
+        return db.session.execute(
+            db.select(User).options(joinedload(User.domains)).where(User.id == int(user_id))
+        ).unique().scalar_one_or_none()
 
     # Register blueprints
     from app.auth import auth_bp
@@ -67,7 +111,7 @@ def create_app():
         try:
             domains = current_user.get_domains()
             
-            return jsonify({
+            return _conditional_json({
                 'success': True,
                 'domains': domains
             })
@@ -163,8 +207,11 @@ def create_app():
                 domain
             )
 
+            # Clients may accept the last known result while it refreshes in the background
+            allow_stale = _flag(request.args.get('allow_stale'))
+
             # Validate domain access first
-            domain_valid, domain_message = api.validate_domain_access()
+            domain_valid, domain_message = api.validate_domain_access(allow_stale=allow_stale)
             if not domain_valid:
                 return jsonify({
                     'error': f'Domain access validation failed: {domain_message}',
@@ -172,7 +219,10 @@ def create_app():
                 }), 403
 
             # Get email accounts
-            accounts = api.get_email_accounts()
+            if allow_stale:
+                accounts, age, stale = api.get_email_accounts_swr()
+            else:
+                accounts, age, stale = api.get_email_accounts(), 0.0, False
 
             # Ensure it's a list
             if not isinstance(accounts, list):
@@ -180,12 +230,16 @@ def create_app():
 
             print(f"API returning {len(accounts)} email accounts for domain {domain}")
 
-            return jsonify({
+            return _conditional_json({
                 'success': True,
                 'accounts': accounts,
-                'domain': domain
+                'domain': domain,
+                'age': round(age, 1),
+                'stale': stale
             })
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error in /api/email-accounts: {str(e)}")
             traceback.print_exc()
@@ -232,8 +286,11 @@ def create_app():
                 domain
             )
 
+            # Clients may accept the last known result while it refreshes in the background
+            allow_stale = _flag(request.args.get('allow_stale'))
+
             # Validate domain access first
-            domain_valid, domain_message = api.validate_domain_access()
+            domain_valid, domain_message = api.validate_domain_access(allow_stale=allow_stale)
             if not domain_valid:
                 return jsonify({
                     'error': f'Domain access validation failed: {domain_message}',
@@ -241,20 +298,74 @@ def create_app():
                 }), 403
 
             # Get forwarders
-            forwarders = api.get_forwarders()
+            if allow_stale:
+                forwarders, age, stale = api.get_forwarders_swr()
+            else:
+                forwarders, age, stale = api.get_forwarders(), 0.0, False
 
             # Ensure it's a list
             if not isinstance(forwarders, list):
                 forwarders = []
 
+            # Paged requests get one filtered, sorted slice of the list plus the total count
+            paging = any(request.args.get(arg) for arg in ('limit', 'cursor', 'sort', 'q'))
+            if paging:
+                try:
+                    limit = request.args.get('limit', type=int) or app.config['DA_PAGE_SIZE']
+                    limit = max(1, min(limit, app.config['DA_MAX_PAGE_SIZE']))
+                    page, total, next_cursor = page_forwarders(
+                        forwarders,
+                        q=request.args.get('q', '').strip(),
+                        sort=request.args.get('sort') or 'address',
+                        cursor=request.args.get('cursor'),
+                        limit=limit
+                    )
+                except ValueError as e:
+                    return jsonify({'error': str(e), 'forwarders': []}), 400
+
+                print(f"API returning {len(page)} of {total} forwarders for domain {domain}")
+                return _conditional_json({
+                    'success': True,
+                    'delta': False,
+                    'forwarders': page,
+                    'total': total,
+                    'next_cursor': next_cursor,
+                    'version': forwarder_delta(api.cache_key, forwarders)[0],
+                    'domain': domain,
+                    'age': round(age, 1),
+                    'stale': stale
+                })
+
+            # Clients holding an older version only need the added/removed pairs
+            version, added, removed = forwarder_delta(api.cache_key, forwarders, request.args.get('since'))
+            if added is not None:
+                print(f"API returning delta for domain {domain}: +{len(added)} -{len(removed)}")
+                return _conditional_json({
+                    'success': True,
+                    'delta': True,
+                    'added': added,
+                    'removed': removed,
+                    'version': version,
+                    'domain': domain,
+                    'age': round(age, 1),
+                    'stale': stale
+                })
+
             print(f"API returning {len(forwarders)} forwarders for domain {domain}")
 
-            return jsonify({
+            return _conditional_json({
                 'success': True,
+                'delta': False,
                 'forwarders': forwarders,
-                'domain': domain
+                'total': len(forwarders),
+                'version': version,
+                'domain': domain,
+                'age': round(age, 1),
+                'stale': stale
             })
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error in /api/forwarders: {str(e)}")
             traceback.print_exc()
@@ -263,6 +374,408 @@ def create_app():
                 'forwarders': []
             }), 500
 
+    @app.route('/api/domain-snapshot', methods=['GET'])
+    @login_required
+    def get_domain_snapshot():
+        """Email accounts and forwarders for one domain, validated once and fetched concurrently"""
+        if not current_user.has_da_config():
+            return jsonify({
+                'error': 'DirectAdmin not configured',
+                'accounts': [],
+                'forwarders': []
+            }), 400
+
+        try:
+            domain = request.args.get('domain') or current_user.get_first_domain()
+            if not domain:
+                return jsonify({
+                    'error': 'No domain specified',
+                    'accounts': [],
+                    'forwarders': []
+                }), 400
+
+            # Verify user has access to this domain
+            if domain not in current_user.get_domains():
+                return jsonify({
+                    'error': 'Access denied to domain',
+                    'accounts': [],
+                    'forwarders': []
+                }), 403
+
+            api = DirectAdminAPI(
+                current_user.da_server,
+                current_user.da_username,
+                current_user.get_da_password(),
+                domain
+            )
+
+            allow_stale = _flag(request.args.get('allow_stale'))
+
+            domain_valid, domain_message = api.validate_domain_access(allow_stale=allow_stale)
+            if not domain_valid:
+                return jsonify({
+                    'error': f'Domain access validation failed: {domain_message}',
+                    'accounts': [],
+                    'forwarders': []
+                }), 403
+
+            if allow_stale:
+                load_accounts, load_forwarders = api.get_email_accounts_swr, api.get_forwarders_swr
+            else:
+                load_accounts = lambda: (api.get_email_accounts(), 0.0, False)
+                load_forwarders = lambda: (api.get_forwarders(), 0.0, False)
+
+            # Both reads share this request's deadline through a copied context
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='da-snapshot') as executor:
+                accounts_future = executor.submit(contextvars.copy_context().run, load_accounts)
+                forwarders_future = executor.submit(contextvars.copy_context().run, load_forwarders)
+                accounts, accounts_age, accounts_stale = accounts_future.result()
+                forwarders, forwarders_age, forwarders_stale = forwarders_future.result()
+
+            version = forwarder_delta(api.cache_key, forwarders)[0]
+
+            print(f"API returning snapshot for domain {domain}: {len(accounts)} accounts, {len(forwarders)} forwarders")
+
+            return _conditional_json({
+                'success': True,
+                'domain': domain,
+                'accounts': accounts,
+                'forwarders': forwarders,
+                'version': version,
+                'age': round(max(accounts_age, forwarders_age), 1),
+                'stale': accounts_stale or forwarders_stale
+            })
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"Error in /api/domain-snapshot: {str(e)}")
+            traceback.print_exc()
+            return jsonify({
+                'error': 'Failed to fetch domain data',
+                'accounts': [],
+                'forwarders': []
+            }), 500
+
+    @app.route('/api/forwarders/search', methods=['GET'])
+    @login_required
+    def search_forwarders():
+        """Find forwarders by destination or alias across all of the user's domains, from the local index"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured', 'results': []}), 400
+
+        term = request.args.get('q', '').strip()
+        if not term:
+            return jsonify({'error': 'Search term is required', 'results': []}), 400
+
+        field = request.args.get('field', 'destination')
+        if field not in ('destination', 'alias'):
+            return jsonify({'error': "field must be 'destination' or 'alias'", 'results': []}), 400
+
+        limit = max(1, min(request.args.get('limit', type=int) or app.config['DA_PAGE_SIZE'],
+                           app.config['DA_MAX_PAGE_SIZE']))
+
+        try:
+            # The index is shared by everyone using this DA login, so prove the password first;
+            # the domain list is cached per credential and only ever filled by an accepted login
+            api = DirectAdminAPI(
+                current_user.da_server,
+                current_user.da_username,
+                current_user.get_da_password()
+            )
+            account_domains = api.get_account_domains(allow_stale=True)
+            domains = current_user.get_domains()
+            if account_domains is not None and not account_domains.issuperset(domains):
+                account_domains = api.get_account_domains(refresh=True)
+            if account_domains is None:
+                return jsonify({'error': 'Could not verify DirectAdmin credentials', 'results': []}), 403
+
+            verified = [d for d in domains if d in account_domains]
+            results, indexed = forwarder_index.search(
+                current_user.da_server,
+                current_user.da_username,
+                verified,
+                term,
+                field=field,
+                exact=request.args.get('match', 'prefix') == 'exact',
+                limit=limit
+            )
+            return jsonify({
+                'success': True,
+                'results': results,
+                'count': len(results),
+                # Domains whose forwarders have not been loaded yet cannot show up in results
+                'unindexed_domains': [d for d in verified if d not in indexed],
+                'unverified_domains': [d for d in domains if d not in account_domains]
+            })
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"Error in /api/forwarders/search: {str(e)}")
+            traceback.print_exc()
+            return jsonify({'error': 'Failed to search forwarders', 'results': []}), 500
+
+    @app.route('/api/forwarders/all', methods=['GET'])
+    @login_required
+    def get_all_forwarders():
+        """Forwarders for every domain of the user, streamed as NDJSON as each domain finishes"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured'}), 400
+
+        # Everything the stream needs is captured now; the request context is gone while it runs
+        domains = current_user.get_domains()
+        results = iter_domain_forwarders(
+            current_user.da_server,
+            current_user.da_username,
+            current_user.get_da_password(),
+            domains
+        )
+
+        def lines():
+            errors = 0
+            try:
+                for result in results:
+                    if not result['success']:
+                        errors += 1
+                    yield json.dumps(result) + '\n'
+                yield json.dumps({'done': True, 'domains': len(domains), 'errors': errors}) + '\n'
+            finally:
+                results.close()
+
+        return Response(lines(), mimetype='application/x-ndjson', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    @app.route('/api/forwarders/export', methods=['GET'])
+    @login_required
+    def export_forwarders():
+        """Stream a CSV or NDJSON backup of the forwarders of one domain or all of them"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured'}), 400
+
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': "format must be 'csv' or 'ndjson'"}), 400
+
+        user_domains = current_user.get_domains()
+        domain = request.args.get('domain', 'all')
+        if domain == 'all':
+            domains = user_domains
+        elif domain in user_domains:
+            domains = [domain]
+        else:
+            return jsonify({'error': 'Access denied to domain'}), 403
+
+        results = iter_domain_forwarders(
+            current_user.da_server,
+            current_user.da_username,
+            current_user.get_da_password(),
+            domains
+        )
+
+        def csv_rows():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+
+            def flush():
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                return chunk
+
+            try:
+                writer.writerow(['domain', 'address', 'destination'])
+                yield flush()
+                for result in results:
+                    if not result['success']:
+                        # Abort the download rather than hand out a silently incomplete backup
+                        raise RuntimeError(f"Export of {result['domain']} failed: {result['error']}")
+                    for forwarder in result['forwarders']:
+                        writer.writerow([result['domain'], forwarder['address'], forwarder['destination']])
+                    yield flush()
+            finally:
+                results.close()
+
+        def ndjson_rows():
+            try:
+                for result in results:
+                    if not result['success']:
+                        yield json.dumps({'domain': result['domain'], 'error': result['error']}) + '\n'
+                        continue
+                    for forwarder in result['forwarders']:
+                        yield json.dumps({'domain': result['domain'], **forwarder}) + '\n'
+            finally:
+                results.close()
+
+        filename = f"forwarders-{domain}.{fmt}"
+        return Response(csv_rows() if fmt == 'csv' else ndjson_rows(),
+                        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+                        headers={
+                            'Content-Disposition': f'attachment; filename="{filename}"',
+                            'Cache-Control': 'no-cache',
+                            'X-Accel-Buffering': 'no'
+                        })
+
+    @app.route('/api/forwarders/import', methods=['POST'])
+    @login_required
+    def import_forwarders():
+        """Validate an uploaded CSV or NDJSON file and create its forwarders in a background job"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured'}), 400
+
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'error': 'No file uploaded'}), 400
+
+        fmt = request.args.get('format') or request.form.get('format')
+        if not fmt:
+            fmt = 'ndjson' if (upload.filename or '').lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': "format must be 'csv' or 'ndjson'"}), 400
+
+        try:
+            server = current_user.da_server
+            username = current_user.da_username
+            password = current_user.get_da_password()
+            operations, errors = parse_import(
+                upload.stream, fmt, server, username, password,
+                set(current_user.get_domains()),
+                default_domain=request.form.get('domain') or current_user.get_first_domain()
+            )
+        except Exception as e:
+            print(f"Error parsing forwarder import: {str(e)}")
+            traceback.print_exc()
+            return jsonify({'error': 'Could not read the uploaded file'}), 400
+
+        if not operations:
+            return jsonify({'error': 'No valid rows to import', 'errors': errors[:MAX_JOB_ERRORS]}), 400
+
+        job_id = job_queue.enqueue('forwarders.import', {
+            'operations': operations,
+            'errors': errors[:MAX_JOB_ERRORS],
+            'rejected': len(errors)
+        }, user_id=current_user.id, total=len(operations))
+        print(f"Queued import job {job_id}: {len(operations)} rows, {len(errors)} rejected")
+        return jsonify({
+            'success': True,
+            'job': job_queue.get(job_id),
+            'rejected': len(errors)
+        }), 202
+
+    @app.route('/api/jobs', methods=['GET'])
+    @login_required
+    def list_jobs():
+        """The user's most recent background jobs"""
+        return jsonify({'success': True, 'jobs': job_queue.list(current_user.id)})
+
+    @app.route('/api/jobs/<job_id>', methods=['GET'])
+    @app.route('/api/forwarders/import/<job_id>', methods=['GET'])
+    @login_required
+    def job_status(job_id):
+        """Status, progress and (once finished) result of a background job"""
+        job = job_queue.get(job_id, current_user.id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': job})
+
+    @app.route('/api/forwarders/sync', methods=['POST'])
+    @login_required
+    def sync_forwarders():
+        """Bring the listed domains to a desired state (domain -> alias -> destination) with minimal changes"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured'}), 400
+
+        dry_run = _flag(request.args.get('dry_run'))
+        try:
+            if request.mimetype in ('application/yaml', 'application/x-yaml', 'text/yaml'):
+                desired = load_desired_state(request.get_data(as_text=True), 'yaml')
+            else:
+                data = request.get_json(silent=True)
+                if not isinstance(data, dict) or not isinstance(data.get('state'), dict):
+                    return jsonify({'error': "Body must be {'state': {domain: {alias: destination}}}"}), 400
+                desired = load_desired_state(json.dumps(data['state']))
+                dry_run = dry_run or bool(data.get('dry_run'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            if not dry_run:
+                # Planning and applying both happen on the job workers, against fresh state
+                job_id = job_queue.enqueue('forwarders.sync', {'state': desired}, user_id=current_user.id)
+                return jsonify({'success': True, 'dry_run': False, 'job': job_queue.get(job_id)}), 202
+
+            plan = plan_sync(
+                current_user.da_server,
+                current_user.da_username,
+                current_user.get_da_password(),
+                desired,
+                set(current_user.get_domains())
+            )
+            return jsonify({
+                'success': not plan['errors'],
+                'dry_run': True,
+                'plan': plan
+            })
+
+        except Exception as e:
+            print(f"Error in /api/forwarders/sync: {str(e)}")
+            traceback.print_exc()
+            return jsonify({'error': 'Failed to sync forwarders'}), 500
+
+    @app.route('/api/forwarders/stream', methods=['GET'])
+    @login_required
+    def stream_forwarders():
+        """Server-sent events feed that pushes the forwarder list whenever it changes"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured'}), 400
+
+        domain = request.args.get('domain') or current_user.get_first_domain()
+        if not domain:
+            return jsonify({'error': 'No domain specified'}), 400
+
+        # Verify user has access to this domain
+        if domain not in current_user.get_domains():
+            return jsonify({'error': 'Access denied to domain'}), 403
+
+        api = DirectAdminAPI(
+            current_user.da_server,
+            current_user.da_username,
+            current_user.get_da_password(),
+            domain
+        )
+
+        domain_valid, domain_message = api.validate_domain_access(allow_stale=True)
+        if not domain_valid:
+            return jsonify({'error': f'Domain access validation failed: {domain_message}'}), 403
+
+        # Each open stream holds a worker thread, so only a few are allowed; clients poll instead
+        subscription = forwarder_feed.subscribe(api)
+        if subscription is None:
+            return jsonify({'error': 'Too many open streams, use polling'}), 503
+
+        max_seconds = app.config['DA_STREAM_MAX_SECONDS']
+
+        def events():
+            try:
+                yield 'retry: 5000\n\n'
+                ends_at = time.monotonic() + max_seconds
+                while time.monotonic() < ends_at:
+                    try:
+                        event = subscription[1].get(timeout=max(min(15, ends_at - time.monotonic()), 0.1))
+                    except queue.Empty:
+                        # Comment line keeps proxies from closing an idle connection
+                        yield ': keep-alive\n\n'
+                        continue
+                    yield f"event: forwarders\ndata: {json.dumps(event)}\n\n"
+            finally:
+                forwarder_feed.unsubscribe(subscription)
+
+        return Response(events(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
     @app.route('/api/forwarders', methods=['POST'])
     @login_required
     def create_forwarder():
@@ -321,6 +834,8 @@ def create_app():
                     'error': 'Failed to create forwarder'
                 }), 400
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error creating forwarder: {str(e)}")
             traceback.print_exc()
@@ -328,6 +843,70 @@ def create_app():
                 'error': 'Failed to create forwarder'
             }), 500
 
+    @app.route('/api/forwarders/batch', methods=['POST'])
+    @login_required
+    def batch_forwarders():
+        """Create and delete many forwarders in one request, with a result per operation"""
+        if not current_user.has_da_config():
+            return jsonify({'error': 'DirectAdmin not configured'}), 400
+
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'No operations provided'}), 400
+        if len(operations) > app.config['DA_BATCH_MAX_ITEMS']:
+            return jsonify({'error': f"At most {app.config['DA_BATCH_MAX_ITEMS']} operations per batch"}), 400
+
+        try:
+            user_domains = set(current_user.get_domains())
+            first_domain = current_user.get_first_domain()
+
+            results = [None] * len(operations)
+            accepted = []  # (index, result stub, operation)
+
+            for index, operation in enumerate(operations):
+                if not isinstance(operation, dict):
+                    results[index] = {'index': index, 'success': False, 'error': 'Invalid operation'}
+                    continue
+                op = operation.get('op')
+                address = str(operation.get('address') or '').strip()
+                domain = str(operation.get('domain') or '').strip()
+                if not domain and '@' in address:
+                    domain = address.split('@', 1)[1]
+                domain = domain or first_domain
+
+                result = {'index': index, 'op': op, 'address': address, 'domain': domain}
+                destination = str(operation.get('destination') or '').strip()
+                if op not in ('create', 'delete'):
+                    results[index] = dict(result, success=False, error="op must be 'create' or 'delete'")
+                elif not address:
+                    results[index] = dict(result, success=False, error='Email address is required')
+                elif domain not in user_domains:
+                    results[index] = dict(result, success=False, error='Access denied to domain')
+                elif op == 'create' and not destination:
+                    results[index] = dict(result, success=False, error='Destination email is required')
+                else:
+                    accepted.append((index, result, {'op': op, 'domain': domain, 'address': address,
+                                                     'destination': destination}))
+
+            # The DirectAdmin calls run on the job workers; this request returns immediately
+            job_id = job_queue.enqueue('forwarders.batch', {
+                'results': results,
+                'accepted': [{'index': index, 'result': result, 'operation': operation}
+                             for index, result, operation in accepted]
+            }, user_id=current_user.id, total=len(operations))
+            print(f"Queued batch job {job_id}: {len(accepted)} of {len(operations)} operations accepted")
+            return jsonify({
+                'success': True,
+                'job': job_queue.get(job_id),
+                'rejected': len(operations) - len(accepted)
+            }), 202
+
+        except Exception as e:
+            print(f"Error in /api/forwarders/batch: {str(e)}")
+            traceback.print_exc()
+            return jsonify({'error': 'Failed to process batch'}), 500
+
     @app.route('/api/forwarders', methods=['DELETE'])
     @login_required
     def delete_forwarder():
@@ -383,6 +962,8 @@ def create_app():
                     'error': message
                 }), 400
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error deleting forwarder: {str(e)}")
             traceback.print_exc()
@@ -409,6 +990,15 @@ def create_app():
             return jsonify({'error': 'Internal server error'}), 500
         return render_template('500.html'), 500
 
+    @app.errorhandler(DeadlineExceeded)
+    def deadline_exceeded(error):
+        """Fail fast when DirectAdmin used up the request's time budget"""
+        print(f"Deadline exceeded on {request.path}: {error}")
+        return jsonify({
+            'error': 'DirectAdmin server did not respond in time. Please try again later.',
+            'timeout': True
+        }), 504
+
     @app.errorhandler(Exception)
     def handle_exception(error):
         """Handle uncaught exceptions"""
@@ -432,120 +1022,9 @@ def create_app():
         with app.app_context():
             print(f"Initializing database at URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
             
-            # Import models to ensure they're registered
-            from app.models import User, UserDomain
-            
-            # Check if we need to handle schema migration
-            needs_migration = False
-            try:
-                # Test if UserDomain table exists by trying a simple query
-                db.session.execute(db.text("SELECT COUNT(*) FROM user_domain")).scalar()
-                print("UserDomain table exists")
-            except Exception as e:
-                print(f"UserDomain table doesn't exist: {e}")
-                needs_migration = True
-            
-            # Always call create_all() to ensure all tables exist
-            db.create_all()
-            print("Database tables created/updated")
-            
-            # If we needed migration, migrate existing users
-            if needs_migration:
-                print("Performing automatic migration to multi-domain...")
-                
-                # Find all users with da_domain set
-                try:
-                    users_with_domains = User.query.filter(User.da_domain.isnot(None)).all()
-                    print(f"Found {len(users_with_domains)} users with domains to migrate")
-                    
-                    for user in users_with_domains:
-                        print(f"Migrating user {user.username} with domain {user.da_domain}")
-                        try:
-                            # Create UserDomain entry directly to avoid circular dependency
-                            existing_domain = UserDomain.query.filter_by(
-                                user_id=user.id, 
-                                domain=user.da_domain
-                            ).first()
-                            
-                            if not existing_domain:
-                                user_domain = UserDomain(
-                                    user_id=user.id,
-                                    domain=user.da_domain,
-                                    order_index=0
-                                )
-                                db.session.add(user_domain)
-                                print(f"  ✓ Created domain entry for {user.username}: {user.da_domain}")
-                            else:
-                                print(f"  - Domain already exists for {user.username}: {user.da_domain}")
-                                
-                        except Exception as e:
-                            print(f"  ✗ Error migrating {user.username}: {e}")
-                    
-                    # Commit migration changes
-                    try:
-                        db.session.commit()
-                        print(f"✓ Successfully migrated {len(users_with_domains)} users to multi-domain.")
-                    except Exception as e:
-                        print(f"✗ Error during migration commit: {e}")
-                        db.session.rollback()
-                        
-                except Exception as e:
-                    print(f"Error during user migration: {e}")
-                    db.session.rollback()
-            else:
-                # Check for users that have da_domain but no UserDomain entries
-                try:
-                    users_to_migrate = User.query.filter(
-                        User.da_domain.isnot(None),
-                        ~User.domains.any()
-                    ).all()
-                    
-                    if users_to_migrate:
-                        print(f"Found {len(users_to_migrate)} users needing domain migration...")
-                        
-                        for user in users_to_migrate:
-                            print(f"Migrating user {user.username} with domain {user.da_domain}")
-                            try:
-                                user_domain = UserDomain(
-                                    user_id=user.id,
-                                    domain=user.da_domain,
-                                    order_index=0
-                                )
-                                db.session.add(user_domain)
-                                print(f"  ✓ Created domain entry for {user.username}: {user.da_domain}")
-                            except Exception as e:
-                                print(f"  ✗ Error migrating {user.username}: {e}")
-                        
-                        try:
-                            db.session.commit()
-                            print(f"✓ Successfully migrated {len(users_to_migrate)} users to multi-domain.")
-                        except Exception as e:
-                            print(f"✗ Error during migration commit: {e}")
-                            db.session.rollback()
-                            
-                except Exception as e:
-                    print(f"Error checking for migration: {e}")
-
-            # Create default admin user only if no administrators exist
-            admin_count = User.query.filter_by(is_admin=True).count()
-            if admin_count == 0:
-                # No administrators exist, create default admin user
-                admin_user = User(username='admin', is_admin=True)
-                admin_user.set_password('changeme')  # Default password
-                db.session.add(admin_user)
-                try:
-                    db.session.commit()
-                    print("=" * 50)
-                    print("Default admin user created!")
-                    print("Username: admin")
-                    print("Password: changeme")
-                    print("PLEASE CHANGE THIS PASSWORD IMMEDIATELY!")
-                    print("=" * 50)
-                except Exception as e:
-                    print(f"Error creating admin user: {e}")
-                    db.session.rollback()
-            else:
-                print(f"Found {admin_count} administrator(s) - skipping default admin creation")
+            # Ordered, versioned schema migrations; a current schema costs one query
+            from app.migrations import upgrade
+            upgrade()
 
             app.config['_DB_INITIALIZED'] = True
 
@@ -557,6 +1036,21 @@ def create_app():
         # Ensure database session is fresh
         db.session.expire_all()
 
+        # Budget for all DirectAdmin calls made while handling this request
+        seconds = app.config['DA_ROUTE_DEADLINES'].get(request.endpoint, app.config['DA_REQUEST_DEADLINE'])
+        g.da_deadline_token = set_deadline(seconds)
+
+    @app.teardown_request
+    def clear_deadline(exception=None):
+        """Drop the DirectAdmin deadline once the request is done"""
+        token = g.pop('da_deadline_token', None)
+        if token is not None:
+            try:
+                reset_deadline(token)
+            except ValueError:
+                # Token was created in a different context (e.g. streamed response)
+                pass
+
     @app.teardown_appcontext
     def shutdown_session(exception=None):
         """Clean up database session"""
@@ -584,9 +1078,16 @@ def create_app():
     @app.cli.command()
     def init_db():
         """Initialize the database"""
-        db.create_all()
+        from app.migrations import upgrade
+        upgrade()
         print("Database initialized!")
 
+    @app.cli.command()
+    def db_version():
+        """Show the applied and latest schema version"""
+        from app.migrations import current_version, LATEST_VERSION
+        print(f"Schema version {current_version()} (latest {LATEST_VERSION})")
+
     @app.cli.command()
     def create_admin():
         """Create an admin user"""
@@ -605,6 +1106,54 @@ def create_app():
             print(f"Error creating admin user: {e}")
             db.session.rollback()
 
+    forwarders_cli = AppGroup('forwarders', help='Manage email forwarders from the command line.')
+
+    @forwarders_cli.command('sync')
+    @click.argument('state_file', type=click.File('r'))
+    @click.option('--user', 'username', required=True, help='User whose DirectAdmin account and domains are used')
+    @click.option('--dry-run', is_flag=True, help='Only show the changes that would be made')
+    @click.option('--format', 'fmt', type=click.Choice(['json', 'yaml']), default=None,
+                  help='State file format (default: from the file extension)')
+    def sync_command(state_file, username, dry_run, fmt):
+        """Sync forwarders to a desired-state file mapping domain -> alias -> destination"""
+        user = User.query.filter_by(username=username).first()
+        if user is None or not user.has_da_config():
+            raise click.ClickException(f"User '{username}' not found or DirectAdmin not configured")
+
+        if fmt is None:
+            fmt = 'yaml' if state_file.name.endswith(('.yml', '.yaml')) else 'json'
+        try:
+            desired = load_desired_state(state_file.read(), fmt)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        server, da_username, password = user.da_server, user.da_username, user.get_da_password()
+        plan = plan_sync(server, da_username, password, desired, set(user.get_domains()))
+
+        for operation in plan['deletes']:
+            click.echo(f"- {operation['address']}")
+        for operation in plan['creates']:
+            click.echo(f"+ {operation['address']} -> {operation['destination']}")
+        for error in plan['errors']:
+            click.echo(f"! {error.get('address', error['domain'])}: {error['error']}", err=True)
+        for summary in plan['domains']:
+            click.echo(f"{summary['domain']}: {summary['create']} to create, {summary['delete']} to delete, "
+                       f"{summary['replace']} to replace, {summary['unchanged']} unchanged")
+
+        if dry_run:
+            click.echo("Dry run: no changes made")
+            return
+
+        results = apply_sync(server, da_username, password, plan)
+        failed = [r for r in results if not r['success']]
+        for result in failed:
+            click.echo(f"! {result['op']} {result['address']}: {result['error']}", err=True)
+        click.echo(f"Applied {len(results) - len(failed)} of {len(results)} changes")
+        if failed or plan['errors']:
+            raise SystemExit(1)
+
+    app.cli.add_command(forwarders_cli)
+
     return app
 
 
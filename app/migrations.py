@@ -0,0 +1,189 @@
+from datetime import datetime
+from cryptography.fernet import Fernet
+from werkzeug.security import generate_password_hash
+from app.models import db, SchemaVersion
+
+# Tables as they stood at version 1. Steps work on frozen definitions like these and never on
+# the models, so an applied step keeps doing the same thing as the models change; a new table,
+# column or index needs a new step.
+_v1 = db.MetaData()
+
+_v1_user = db.Table(
+    'user', _v1,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('username', db.String(80), unique=True, nullable=False),
+    db.Column('password_hash', db.String(120), nullable=False),
+    db.Column('totp_secret', db.String(32)),
+    db.Column('totp_enabled', db.Boolean),
+    db.Column('is_admin', db.Boolean),
+    db.Column('created_at', db.DateTime),
+    db.Column('last_login', db.DateTime),
+    db.Column('da_server', db.String(255)),
+    db.Column('da_username', db.String(255)),
+    db.Column('da_password_encrypted', db.Text),
+    db.Column('da_domain', db.String(255)),
+    db.Column('theme_preference', db.String(20)),
+    db.Column('encryption_key', db.String(255)),
+)
+
+_v1_user_domain = db.Table(
+    'user_domain', _v1,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('domain', db.String(255), nullable=False),
+    db.Column('order_index', db.Integer, nullable=False),
+    db.Column('created_at', db.DateTime),
+)
+
+db.Table(
+    'endpoint_variant', _v1,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('server', db.String(255), nullable=False),
+    db.Column('operation', db.String(64), nullable=False),
+    db.Column('variant', db.String(255), nullable=False),
+    db.Column('updated_at', db.DateTime),
+    db.UniqueConstraint('server', 'operation', name='uq_endpoint_variant_server_operation'),
+)
+
+db.Table(
+    'forwarder_index_entry', _v1,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('server', db.String(255), nullable=False),
+    db.Column('da_username', db.String(255), nullable=False),
+    db.Column('domain', db.String(255), nullable=False),
+    db.Column('alias', db.String(255), nullable=False),
+    db.Column('destination', db.String(255), nullable=False),
+    db.Index('ix_forwarder_index_destination', 'destination'),
+    db.Index('ix_forwarder_index_alias', 'alias'),
+    db.Index('ix_forwarder_index_account_domain', 'server', 'da_username', 'domain'),
+)
+
+db.Table(
+    'forwarder_index_state', _v1,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('server', db.String(255), nullable=False),
+    db.Column('da_username', db.String(255), nullable=False),
+    db.Column('domain', db.String(255), nullable=False),
+    db.Column('version', db.String(32)),
+    db.Column('indexed_at', db.DateTime),
+    db.UniqueConstraint('server', 'da_username', 'domain', name='uq_forwarder_index_state_domain'),
+)
+
+
+def _initial_schema(conn):
+    """Create the version 1 tables, move legacy single-domain users to user_domain and seed the first admin
+
+    Databases from before schema versioning start here too, so every part is idempotent.
+    """
+    _v1.create_all(bind=conn)
+
+    users = _v1_user
+    domains = _v1_user_domain
+    legacy = conn.execute(
+        db.select(users.c.id, users.c.username, users.c.da_domain).where(
+            users.c.da_domain.isnot(None),
+            ~db.exists().where(domains.c.user_id == users.c.id)
+        )
+    ).all()
+    for user_id, username, domain in legacy:
+        conn.execute(domains.insert().values(user_id=user_id, domain=domain, order_index=0,
+                                             created_at=datetime.utcnow()))
+        print(f"  ✓ Created domain entry for {username}: {domain}")
+    if legacy:
+        print(f"✓ Migrated {len(legacy)} users to multi-domain.")
+
+    admins = conn.execute(db.select(db.func.count()).select_from(users).where(users.c.is_admin.is_(True))).scalar()
+    if admins == 0:
+        conn.execute(users.insert().values(
+            username='admin',
+            # Default password; pbkdf2 fits the version 1 column, which scrypt hashes outgrow
+            password_hash=generate_password_hash('changeme', method='pbkdf2:sha256'),
+            totp_enabled=False,
+            is_admin=True,
+            created_at=datetime.utcnow(),
+            theme_preference='light',
+            encryption_key=Fernet.generate_key().decode()
+        ))
+        print("=" * 50)
+        print("Default admin user created!")
+        print("Username: admin")
+        print("Password: changeme")
+        print("PLEASE CHANGE THIS PASSWORD IMMEDIATELY!")
+        print("=" * 50)
+
+
+def _user_domain_indexes(conn):
+    """Drop duplicate (user_id, domain) rows, then add the unique and ordering indexes"""
+    domains = _v1_user_domain
+    keep = db.select(db.func.min(domains.c.id)).group_by(domains.c.user_id, domains.c.domain).scalar_subquery()
+    removed = conn.execute(domains.delete().where(domains.c.id.not_in(keep))).rowcount
+    if removed:
+        print(f"  Removed {removed} duplicate domain entries")
+    conn.execute(db.text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_domain_user_domain ON user_domain (user_id, domain)"))
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_user_domain_user_order ON user_domain (user_id, order_index)"))
+
+
+def _widen_password_hash(conn):
+    """Make room for scrypt password hashes (about 160 characters) in user.password_hash
+
+    SQLite does not enforce VARCHAR lengths, so only server databases need the change.
+    """
+    if conn.dialect.name == 'sqlite':
+        return
+    table = conn.dialect.identifier_preparer.quote('user')
+    if conn.dialect.name in ('mysql', 'mariadb'):
+        conn.execute(db.text(f"ALTER TABLE {table} MODIFY password_hash VARCHAR(255) NOT NULL"))
+    else:
+        conn.execute(db.text(f"ALTER TABLE {table} ALTER COLUMN password_hash TYPE VARCHAR(255)"))
+
+
+# Ordered schema steps; append new ones with the next version number and never edit applied ones.
+# Every schema change to app/models.py needs its own step here (tests/test_migrations.py checks this).
+MIGRATIONS = [
+    (1, 'Initial schema and multi-domain migration', _initial_schema),
+    (2, 'Unique (user_id, domain) and ordering indexes on user_domain', _user_domain_indexes),
+    (3, 'Widen user.password_hash for scrypt hashes', _widen_password_hash),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version():
+    """Highest applied migration, or 0 for a new database or one from before versioning"""
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(db.select(db.func.max(SchemaVersion.version))).scalar() or 0
+    except Exception:
+        return 0
+
+
+def upgrade():
+    """Apply pending migrations in order, each in its own transaction; returns the versions applied
+
+    A current schema costs a single query.
+    """
+    version = current_version()
+    if version >= LATEST_VERSION:
+        print(f"Database schema is current (version {version})")
+        return []
+
+    applied = []
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        print(f"Applying migration {number}: {description}")
+        with db.engine.begin() as conn:
+            SchemaVersion.__table__.create(bind=conn, checkfirst=True)
+            # Another process may have got here first
+            done = conn.execute(db.select(SchemaVersion.version).where(SchemaVersion.version == number)).first()
+            if done:
+                continue
+            step(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(
+                version=number, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(number)
+    print(f"Database schema upgraded to version {LATEST_VERSION}")
+    return applied
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from cryptography.fernet import Fernet
@@ -9,6 +10,27 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+def configure_engine(engine):
+    """Apply the SQLite connection profile from Config to every new connection of engine"""
+    # Connections opened before gunicorn forks (migrations under --preload) must stay with the master
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+    if engine.dialect.name != 'sqlite':
+        return
+
+    from app.config import Config
+
+    @event.listens_for(engine, 'connect')
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={Config.DB_SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={Config.DB_SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={Config.DB_BUSY_TIMEOUT}")
+        finally:
+            cursor.close()
+
 class UserDomain(db.Model):
     """Model for storing multiple domains per user"""
     id = db.Column(db.Integer, primary_key=True)
@@ -19,6 +41,11 @@ class UserDomain(db.Model):
     
     # Relationship back to user
     user = db.relationship('User', backref=db.backref('domains', lazy=True, order_by='UserDomain.order_index'))
+
+    __table_args__ = (
+        db.Index('uq_user_domain_user_domain', 'user_id', 'domain', unique=True),
+        db.Index('ix_user_domain_user_order', 'user_id', 'order_index'),
+    )
     
     def __repr__(self):
         return f'<UserDomain {self.domain} for user {self.user_id}>'
@@ -31,11 +58,72 @@ class UserDomain(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class SchemaVersion(db.Model):
+    """One row per applied schema migration (see app/migrations.py)"""
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(255), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
+
+class EndpointVariant(db.Model):
+    """DirectAdmin endpoint/method/params shape that last worked for an operation on a server"""
+    id = db.Column(db.Integer, primary_key=True)
+    server = db.Column(db.String(255), nullable=False)
+    operation = db.Column(db.String(64), nullable=False)
+    variant = db.Column(db.String(255), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('server', 'operation', name='uq_endpoint_variant_server_operation'),)
+
+    def __repr__(self):
+        return f'<EndpointVariant {self.operation} on {self.server}: {self.variant}>'
+
+class ForwarderIndexEntry(db.Model):
+    """One (domain, alias, destination) row of the local reverse index of forwarders"""
+    id = db.Column(db.Integer, primary_key=True)
+    server = db.Column(db.String(255), nullable=False)
+    da_username = db.Column(db.String(255), nullable=False)
+    domain = db.Column(db.String(255), nullable=False)
+    alias = db.Column(db.String(255), nullable=False)
+    destination = db.Column(db.String(255), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_forwarder_index_destination', 'destination'),
+        db.Index('ix_forwarder_index_alias', 'alias'),
+        db.Index('ix_forwarder_index_account_domain', 'server', 'da_username', 'domain'),
+    )
+
+    def __repr__(self):
+        return f'<ForwarderIndexEntry {self.alias}@{self.domain} -> {self.destination}>'
+
+    def to_dict(self):
+        return {
+            'domain': self.domain,
+            'address': f'{self.alias}@{self.domain}',
+            'destination': self.destination
+        }
+
+class ForwarderIndexState(db.Model):
+    """Which forwarder list version is indexed for a domain, and when it was indexed"""
+    id = db.Column(db.Integer, primary_key=True)
+    server = db.Column(db.String(255), nullable=False)
+    da_username = db.Column(db.String(255), nullable=False)
+    domain = db.Column(db.String(255), nullable=False)
+    version = db.Column(db.String(32), nullable=True)
+    indexed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('server', 'da_username', 'domain', name='uq_forwarder_index_state_domain'),)
+
+    def __repr__(self):
+        return f'<ForwarderIndexState {self.domain} on {self.server}: {self.version}>'
+
 class User(UserMixin, db.Model):
     # Primary fields
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
 
     # 2FA/TOTP fields
     totp_secret = db.Column(db.String(32), nullable=True)
@@ -186,22 +274,47 @@ class User(UserMixin, db.Model):
             print(f"Error adding domain {domain} for user {self.username}: {e}")
             return False, f"Failed to add domain: {str(e)}"
     
+    def add_domains(self, domains):
+        """Add many domains in one INSERT, appended in the given order after the existing ones
+
+        Returns (added, skipped), where skipped are the domains already configured. The caller
+        commits, as with add_domain().
+        """
+        wanted = list(dict.fromkeys(domains))
+        if not wanted:
+            return [], []
+
+        existing = set(db.session.scalars(
+            db.select(UserDomain.domain).where(UserDomain.user_id == self.id, UserDomain.domain.in_(wanted))
+        ))
+        added = [d for d in wanted if d not in existing]
+        skipped = [d for d in wanted if d in existing]
+        if added:
+            max_order = db.session.query(db.func.max(UserDomain.order_index)).filter_by(user_id=self.id).scalar()
+            next_order = (max_order if max_order is not None else -1) + 1
+            db.session.execute(db.insert(UserDomain), [
+                {'user_id': self.id, 'domain': d, 'order_index': next_order + i}
+                for i, d in enumerate(added)
+            ])
+            db.session.expire(self, ['domains'])
+        return added, skipped
+
     def remove_domain(self, domain):
         """Remove a domain for this user"""
         try:
-            user_domain = UserDomain.query.filter_by(user_id=self.id, domain=domain).first()
-            if not user_domain:
+            order_index = db.session.query(UserDomain.order_index).filter_by(user_id=self.id, domain=domain).scalar()
+            if order_index is None:
                 return False, "Domain not found"
             
-            db.session.delete(user_domain)
+            db.session.execute(db.delete(UserDomain).where(
+                UserDomain.user_id == self.id, UserDomain.domain == domain
+            ))
             
-            # Reorder remaining domains
-            remaining_domains = UserDomain.query.filter_by(user_id=self.id).filter(
-                UserDomain.order_index > user_domain.order_index
-            ).all()
-            
-            for domain_obj in remaining_domains:
-                domain_obj.order_index -= 1
+            # Close the gap with one range update instead of loading the later rows
+            db.session.execute(db.update(UserDomain).where(
+                UserDomain.user_id == self.id, UserDomain.order_index > order_index
+            ).values(order_index=UserDomain.order_index - 1))
+            db.session.expire(self, ['domains'])
             
             return True, "Domain removed successfully"
             
@@ -212,10 +325,13 @@ class User(UserMixin, db.Model):
     def reorder_domains(self, domain_list):
         """Reorder domains based on provided list"""
         try:
-            for i, domain in enumerate(domain_list):
-                user_domain = UserDomain.query.filter_by(user_id=self.id, domain=domain).first()
-                if user_domain:
-                    user_domain.order_index = i
+            positions = {domain: i for i, domain in enumerate(domain_list)}
+            if positions:
+                # One UPDATE ... SET order_index = CASE domain WHEN ... for the whole list
+                db.session.execute(db.update(UserDomain).where(
+                    UserDomain.user_id == self.id, UserDomain.domain.in_(list(positions))
+                ).values(order_index=db.case(positions, value=UserDomain.domain)))
+                db.session.expire(self, ['domains'])
             
             return True, "Domains reordered successfully"
             
@@ -267,8 +383,21 @@ class User(UserMixin, db.Model):
 
     # ===== Utility Methods =====
 
-    def to_dict(self):
-        """Convert user to dictionary (for API responses)"""
+    def to_dict(self, domains=None):
+        """Convert user to dictionary (for API responses)
+
+        Listings pass the user's domain names (loaded for the whole page at once) so the
+        domains relationship is not loaded row by row.
+        """
+        if domains is None:
+            domains = self.get_domains()
+            has_da_config = self.has_da_config()
+        else:
+            # Same legacy fallback as get_domains()
+            if not domains and self.da_domain:
+                domains = [self.da_domain]
+            has_da_config = all([self.da_server, self.da_username, self.da_password_encrypted]) and bool(domains)
+
         return {
             'id': self.id,
             'username': self.username,
@@ -276,11 +405,12 @@ class User(UserMixin, db.Model):
             'totp_enabled': self.totp_enabled,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'last_login': self.last_login.isoformat() if self.last_login else None,
-            'has_da_config': self.has_da_config(),
+            'has_da_config': has_da_config,
             'da_server': self.da_server,
             'da_username': self.da_username,
             'da_domain': self.da_domain,  # Keep for backward compatibility
-            'domains': self.get_domains()
+            'domains': domains,
+            'domain_count': len(domains)
             # Never include passwords or secrets in dict!
         }
 
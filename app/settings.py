@@ -1,7 +1,7 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models import db, UserDomain
-from app.directadmin_api import DirectAdminAPI
+from app.directadmin_api import DirectAdminAPI, DeadlineExceeded
 import traceback
 
 settings_bp = Blueprint('settings', __name__, url_prefix='/settings')
@@ -58,6 +58,10 @@ def update_da_config():
         if not current_user.encryption_key:
             current_user.generate_encryption_key()
 
+        # Credentials may be changing, so drop the domain list cached for the old account
+        DirectAdminAPI.invalidate_domain_cache(current_user.da_server, current_user.da_username,
+                                               current_user.get_da_password())
+
         # Clean and save the server URL
         server_url = data['da_server'].strip()
         if not server_url.startswith(('http://', 'https://')):
@@ -149,6 +153,8 @@ def test_connection():
         print(f"Sending response: {result}")
         return jsonify(result)
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"Test connection error: {str(e)}")
         print(traceback.format_exc())
@@ -206,6 +212,8 @@ def add_domain():
                 current_user.da_domain = domain
             
             db.session.commit()
+            DirectAdminAPI.invalidate_domain_cache(current_user.da_server, current_user.da_username,
+                                                   current_user.get_da_password())
             return jsonify({
                 'success': True,
                 'message': message,
@@ -220,6 +228,57 @@ def add_domain():
         db.session.rollback()
         return jsonify({'error': 'An internal error has occurred.'}), 500
 
+@settings_bp.route('/api/domains/bulk', methods=['POST'])
+@login_required
+def add_domains():
+    """Add several domains for the current user in one transaction"""
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('domains'), list) or not data['domains']:
+            return jsonify({'error': 'A non-empty domains list is required'}), 400
+
+        max_items = current_app.config['DA_BATCH_MAX_ITEMS']
+        if len(data['domains']) > max_items:
+            return jsonify({'error': f'At most {max_items} domains per request'}), 400
+
+        domains = []
+        invalid = []
+        for domain in data['domains']:
+            domain = domain.strip() if isinstance(domain, str) else ''
+            # Same basic validation as a single add
+            if not domain or not '.' in domain or ' ' in domain:
+                invalid.append(domain)
+            else:
+                domains.append(domain)
+
+        if invalid:
+            return jsonify({'error': 'Invalid domain format', 'invalid': invalid}), 400
+
+        added, skipped = current_user.add_domains(domains)
+
+        if added:
+            # Update da_domain if these are the first domains (backward compatibility)
+            if not current_user.da_domain:
+                current_user.da_domain = added[0]
+
+            db.session.commit()
+            DirectAdminAPI.invalidate_domain_cache(current_user.da_server, current_user.da_username,
+                                                   current_user.get_da_password())
+
+        return jsonify({
+            'success': True,
+            'message': f'Added {len(added)} domain(s)' + (f', {len(skipped)} already configured' if skipped else ''),
+            'added': added,
+            'skipped': skipped,
+            'domains': current_user.get_domains()
+        })
+
+    except Exception as e:
+        print(f"Error adding domains: {str(e)}")
+        print(traceback.format_exc())
+        db.session.rollback()
+        return jsonify({'error': 'An internal error has occurred.'}), 500
+
 @settings_bp.route('/api/domains', methods=['DELETE'])
 @login_required
 def remove_domain():
@@ -239,6 +298,8 @@ def remove_domain():
                 current_user.da_domain = first_domain
             
             db.session.commit()
+            DirectAdminAPI.invalidate_domain_cache(current_user.da_server, current_user.da_username,
+                                                   current_user.get_da_password())
             return jsonify({
                 'success': True,
                 'message': message,
@@ -1,11 +1,26 @@
 let currentEditUserId = null;
 
+// Users are fetched a page at a time; usersCursors[i] is the cursor that loads page i
+const USERS_PAGE_SIZE = 50;
+let usersCursors = [null];
+let usersPage = 0;
+let usersSearch = '';
+let usersSearchTimer = null;
+
 async function loadUsers() {
     try {
-        const response = await fetch('/admin/api/users');
-        const users = await response.json();
+        const params = new URLSearchParams({ limit: USERS_PAGE_SIZE });
+        if (usersSearch) params.set('q', usersSearch);
+        if (usersCursors[usersPage]) params.set('cursor', usersCursors[usersPage]);
+
+        const response = await fetch(`/admin/api/users?${params}`);
+        const data = await response.json();
+        const users = data.users || [];
         const tbody = document.getElementById('usersList');
 
+        usersCursors[usersPage + 1] = data.next_cursor;
+        updateUsersPager(data.total || 0, Boolean(data.next_cursor));
+
         if (users.length === 0) {
             tbody.innerHTML = '<tr><td colspan="6">No users found</td></tr>';
             return;
@@ -29,6 +44,29 @@ async function loadUsers() {
     }
 }
 
+// Show the pager only when there is more than one page
+function updateUsersPager(total, hasNext) {
+    const pager = document.getElementById('usersPager');
+    if (!pager) return;
+
+    const pageCount = Math.max(1, Math.ceil(total / USERS_PAGE_SIZE));
+    pager.style.display = pageCount > 1 ? '' : 'none';
+    document.getElementById('usersPageInfo').textContent = `Page ${usersPage + 1} of ${pageCount} (${total} users)`;
+    document.getElementById('usersPrev').disabled = usersPage === 0;
+    document.getElementById('usersNext').disabled = !hasNext;
+}
+
+function changeUsersPage(step) {
+    usersPage = Math.max(0, usersPage + step);
+    loadUsers();
+}
+
+// Restart from the first page, e.g. after the search changed
+function resetUsersPaging() {
+    usersCursors = [null];
+    usersPage = 0;
+}
+
 function formatDate(dateString) {
     if (!dateString) return '';
     const date = new Date(dateString);
@@ -47,10 +85,9 @@ function showCreateUserModal() {
 }
 
 async function editUser(userId) {
-    const users = await fetch('/admin/api/users').then(r => r.json());
-    const user = users.find(u => u.id === userId);
-
-    if (!user) return;
+    const response = await fetch(`/admin/api/users/${userId}`);
+    if (!response.ok) return;
+    const user = await response.json();
 
     document.getElementById('modalTitle').textContent = 'Edit User';
     document.getElementById('userId').value = user.id;
@@ -157,6 +194,18 @@ async function deleteUser(userId, username) {
 // Load users on page load
 document.addEventListener('DOMContentLoaded', () => {
     loadUsers();
+
+    const search = document.getElementById('userSearch');
+    if (search) {
+        search.addEventListener('input', () => {
+            clearTimeout(usersSearchTimer);
+            usersSearchTimer = setTimeout(() => {
+                usersSearch = search.value.trim();
+                resetUsersPaging();
+                loadUsers();
+            }, 250);
+        });
+    }
 });
 
 // Click outside modal to close
@@ -4,6 +4,30 @@ let emailAccounts = [];
 let availableDomains = [];
 let selectedDomain = null;
 
+// Delay before re-polling when the server answered with stale (still refreshing) data
+const STALE_RETRY_MS = 5000;
+let staleRetryTimer = null;
+
+// Live updates: server-sent events, falling back to polling that backs off on errors
+const POLL_BASE_MS = 60000;
+const POLL_MAX_MS = 600000;
+let forwarderStream = null;
+let pollTimer = null;
+let pollDelay = POLL_BASE_MS;
+
+// Domain whose data is currently rendered, so a 304 for it can skip re-rendering
+let renderedForwardersDomain = null;
+let renderedAccountsDomain = null;
+
+// Server version token of the rendered forwarder list, used to request only the changes
+let forwardersVersion = null;
+
+// Only one page of the (filtered) forwarder list is turned into table rows at a time
+const FORWARDER_PAGE_SIZE = 100;
+let forwarderPage = 0;
+let forwarderFilter = '';
+let forwarderFilterTimer = null;
+
 // Generate a random string for email alias (12-18 characters)
 function generateRandomAlias() {
     const chars = 'abcdefghijklmnopqrstuvwxyz0123456789';
@@ -42,13 +66,33 @@ function isValidDestination(destination) {
     return emailRegex.test(destination);
 }
 
+// Last ETag and body per URL, so unchanged data comes back as an empty 304
+const responseCache = {};
+
+// Fetch JSON with If-None-Match; on 304 the previously received body is returned
+async function fetchJSONWithETag(url) {
+    const cached = responseCache[url];
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+
+    const response = await fetch(url, { headers: headers });
+    if (response.status === 304 && cached) {
+        return { response: response, data: cached.data, ok: true, notModified: true };
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        responseCache[url] = { etag: etag, data: data };
+    }
+    return { response: response, data: data, ok: response.ok, notModified: false };
+}
+
 // Load available domains
 async function loadDomains() {
     try {
-        const response = await fetch('/api/domains');
-        const data = await response.json();
+        const { ok, data } = await fetchJSONWithETag('/api/domains');
 
-        if (response.ok && data.domains) {
+        if (ok && data.domains) {
             availableDomains = data.domains;
             
             // Set selected domain to first domain if not set
@@ -61,8 +105,8 @@ async function loadDomains() {
             
             // Load data for selected domain
             if (selectedDomain) {
-                await loadEmailAccounts();
-                await loadForwarders();
+                await loadDomainSnapshot();
+                startLiveUpdates();
             }
         } else {
             console.error('Failed to load domains:', data.error);
@@ -122,46 +166,74 @@ async function switchDomain() {
     // Clear current data
     currentForwarders = [];
     emailAccounts = [];
+    forwarderPage = 0;
     
     // Load new data
+    stopLiveUpdates();
     if (selectedDomain) {
-        await loadEmailAccounts();
-        await loadForwarders();
+        await loadDomainSnapshot();
+        startLiveUpdates();
     }
 }
 
 // Make switchDomain globally available
 window.switchDomain = switchDomain;
 
-// Load email accounts for destination dropdown
-async function loadEmailAccounts() {
-    if (!selectedDomain) {
-        console.log('No domain selected, skipping email accounts load');
-        return;
-    }
+// Load email accounts and forwarders for the selected domain in one request
+async function loadDomainSnapshot() {
+    const tbody = document.querySelector('#forwardersTable tbody');
+    if (!selectedDomain) return;
 
+    const domain = selectedDomain;
     try {
-        const response = await fetch(`/api/email-accounts?domain=${encodeURIComponent(selectedDomain)}`);
-        const data = await response.json();
+        const { response, ok, data, notModified } = await fetchJSONWithETag(`/api/domain-snapshot?domain=${encodeURIComponent(domain)}&allow_stale=1`);
+
+        // The user switched domains while this request was running
+        if (domain !== selectedDomain) return;
 
-        if (response.ok && data.accounts) {
-            emailAccounts = data.accounts;
+        if (!ok) {
+            renderedAccountsDomain = null;
+            renderedForwardersDomain = null;
+            forwardersVersion = null;
             updateDestinationDropdown();
-        } else {
-            console.error('Failed to load email accounts:', data.error);
             if (response.status === 403) {
-                showMessage(`Domain access denied: ${selectedDomain} may not be configured in your DirectAdmin account`, 'error');
+                showMessage(`Domain access denied: ${domain} may not be configured in your DirectAdmin account`, 'error');
+                if (tbody) {
+                    tbody.innerHTML = '<tr><td colspan="3" class="error-message">Domain access denied: ' + escapeHTML(domain) + ' may not be configured in your DirectAdmin account.</td></tr>';
+                }
             } else {
-                showMessage(`Failed to load email accounts for ${selectedDomain}: ${data.error || 'Unknown error'}`, 'error');
+                showMessage(`Failed to load data for ${domain}: ${data.error || 'Unknown error'}`, 'error');
+                if (tbody) {
+                    tbody.innerHTML = '<tr><td colspan="3" class="error-message">Failed to load forwarders for ' + escapeHTML(domain) + '. Please check your DirectAdmin settings.</td></tr>';
+                }
             }
-            
-            // Clear dropdown on error
+            return;
+        }
+
+        if (!(notModified && renderedAccountsDomain === domain)) {
+            emailAccounts = Array.isArray(data.accounts) ? data.accounts : [];
             updateDestinationDropdown();
+            renderedAccountsDomain = domain;
+        }
+
+        if (!(notModified && renderedForwardersDomain === domain)) {
+            currentForwarders = Array.isArray(data.forwarders) ? data.forwarders : [];
+            displayForwarders();
+            renderedForwardersDomain = domain;
+        }
+        forwardersVersion = data.version || null;
+
+        // Stale data is being refreshed server-side; pick up the fresh copy shortly
+        clearTimeout(staleRetryTimer);
+        if (data.stale) {
+            staleRetryTimer = setTimeout(loadForwarders, STALE_RETRY_MS);
         }
     } catch (error) {
-        console.error('Error loading email accounts:', error);
-        showMessage(`Error loading email accounts for ${selectedDomain}`, 'error');
-        updateDestinationDropdown();
+        console.error('Error loading domain snapshot:', error);
+        showMessage(`Error loading data for ${domain}`, 'error');
+        renderedAccountsDomain = null;
+        renderedForwardersDomain = null;
+        forwardersVersion = null;
     }
 }
 
@@ -227,74 +299,246 @@ async function loadForwarders() {
 
     if (!selectedDomain) {
         tbody.innerHTML = '<tr><td colspan="3" class="no-data">No domain selected</td></tr>';
-        return;
+        return true;
     }
 
     try {
-        const response = await fetch(`/api/forwarders?domain=${encodeURIComponent(selectedDomain)}`);
+        const url = `/api/forwarders?domain=${encodeURIComponent(selectedDomain)}&allow_stale=1`;
+        const haveVersion = renderedForwardersDomain === selectedDomain && forwardersVersion;
+
+        // With a rendered version only the changes are requested; otherwise the full list
+        let result;
+        if (haveVersion) {
+            const response = await fetch(`${url}&since=${encodeURIComponent(forwardersVersion)}`);
+            result = { response: response, ok: response.ok, data: await response.json(), notModified: false };
+        } else {
+            result = await fetchJSONWithETag(url);
+        }
+        const { response, ok, data, notModified } = result;
+
+        // Nothing changed: keep the rendered table as it is
+        if (notModified && renderedForwardersDomain === selectedDomain) {
+            return true;
+        }
 
-        if (!response.ok) {
+        if (!ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
         console.log('Forwarders response:', data);
 
-        // Extract forwarders array from response
-        if (data && Array.isArray(data.forwarders)) {
-            currentForwarders = data.forwarders;
+        if (data && data.delta && haveVersion) {
+            applyForwarderDelta(data.added || [], data.removed || []);
         } else {
-            console.warn('Unexpected forwarders format:', data);
-            currentForwarders = [];
+            // Extract forwarders array from response
+            if (data && Array.isArray(data.forwarders)) {
+                currentForwarders = data.forwarders;
+            } else {
+                console.warn('Unexpected forwarders format:', data);
+                currentForwarders = [];
+            }
+
+            displayForwarders();
         }
+        renderedForwardersDomain = selectedDomain;
+        forwardersVersion = data ? data.version : null;
 
-        displayForwarders();
+        // Stale data is being refreshed server-side; pick up the fresh copy shortly
+        clearTimeout(staleRetryTimer);
+        if (data && data.stale) {
+            staleRetryTimer = setTimeout(loadForwarders, STALE_RETRY_MS);
+        }
+        return true;
 
     } catch (error) {
         console.error('Error loading forwarders:', error);
+        renderedForwardersDomain = null;
+        forwardersVersion = null;
         
         if (error.response && error.response.status === 403) {
             tbody.innerHTML = '<tr><td colspan="3" class="error-message">Domain access denied: ' + escapeHTML(selectedDomain) + ' may not be configured in your DirectAdmin account.</td></tr>';
         } else {
             tbody.innerHTML = '<tr><td colspan="3" class="error-message">Failed to load forwarders for ' + escapeHTML(selectedDomain) + '. Please check your DirectAdmin settings.</td></tr>';
         }
+        return false;
     }
 }
 
-// Display forwarders in the table
+// Open the change feed for the selected domain (or fall back to polling)
+function startLiveUpdates() {
+    stopLiveUpdates();
+    if (!selectedDomain || document.hidden) return;
+
+    if (!window.EventSource) {
+        schedulePoll();
+        return;
+    }
+
+    const stream = new EventSource(`/api/forwarders/stream?domain=${encodeURIComponent(selectedDomain)}`);
+    stream.addEventListener('forwarders', event => {
+        const data = JSON.parse(event.data);
+        if (data.domain !== selectedDomain || data.version === forwardersVersion) return;
+
+        if (renderedForwardersDomain === data.domain) {
+            const { added, removed } = diffForwarders(currentForwarders, data.forwarders);
+            applyForwarderDelta(added, removed);
+        } else {
+            currentForwarders = data.forwarders;
+            displayForwarders();
+        }
+        renderedForwardersDomain = data.domain;
+        forwardersVersion = data.version;
+    });
+    stream.onerror = () => {
+        // While CONNECTING the browser reconnects by itself; CLOSED means the server refused
+        if (stream.readyState === EventSource.CLOSED) {
+            forwarderStream = null;
+            schedulePoll();
+        }
+    };
+    forwarderStream = stream;
+}
+
+// Close the change feed and cancel any pending poll
+function stopLiveUpdates() {
+    if (forwarderStream) {
+        forwarderStream.close();
+        forwarderStream = null;
+    }
+    clearTimeout(pollTimer);
+    pollTimer = null;
+}
+
+// Poll while the tab is visible, doubling the delay after each failure
+function schedulePoll() {
+    clearTimeout(pollTimer);
+    if (document.hidden) return;
+
+    pollTimer = setTimeout(async () => {
+        const ok = selectedDomain ? await loadForwarders() : true;
+        pollDelay = ok ? POLL_BASE_MS : Math.min(pollDelay * 2, POLL_MAX_MS);
+        schedulePoll();
+    }, pollDelay);
+}
+
+// Hidden tabs neither stream nor poll; catch up as soon as the tab is shown again
+document.addEventListener('visibilitychange', async () => {
+    if (!document.getElementById('forwardersTable')) return;
+
+    if (document.hidden) {
+        stopLiveUpdates();
+    } else if (selectedDomain) {
+        await loadForwarders();
+        startLiveUpdates();
+    }
+});
+
+// Identity of a forwarder row: the (address, destination) pair
+function forwarderKey(forwarder) {
+    return `${forwarder.address}\n${forwarder.destination}`;
+}
+
+// Build one table row for a forwarder
+function buildForwarderRow(forwarder) {
+    const row = document.createElement('tr');
+    row.dataset.key = forwarderKey(forwarder);
+
+    // Create cells
+    const fromCell = document.createElement('td');
+    fromCell.textContent = forwarder.address || 'Unknown';
+
+    const toCell = document.createElement('td');
+    toCell.textContent = forwarder.destination || 'Unknown';
+
+    const actionsCell = document.createElement('td');
+    const deleteBtn = document.createElement('button');
+    deleteBtn.className = 'btn-danger';
+    deleteBtn.textContent = 'Delete';
+    deleteBtn.onclick = () => deleteForwarder(forwarder.address);
+    actionsCell.appendChild(deleteBtn);
+
+    row.appendChild(fromCell);
+    row.appendChild(toCell);
+    row.appendChild(actionsCell);
+    return row;
+}
+
+// Forwarders matching the filter box, ordered by address
+function visibleForwarders() {
+    const needle = forwarderFilter.toLowerCase();
+    const rows = needle
+        ? currentForwarders.filter(f =>
+            (f.address || '').toLowerCase().includes(needle) ||
+            (f.destination || '').toLowerCase().includes(needle))
+        : currentForwarders.slice();
+    return rows.sort((a, b) => (a.address || '').localeCompare(b.address || ''));
+}
+
+// Display the current page of forwarders in the table
 function displayForwarders() {
     const tbody = document.querySelector('#forwardersTable tbody');
     if (!tbody) return;
 
     tbody.innerHTML = '';
 
+    const rows = visibleForwarders();
+    const pageCount = Math.max(1, Math.ceil(rows.length / FORWARDER_PAGE_SIZE));
+    forwarderPage = Math.min(forwarderPage, pageCount - 1);
+    updateForwarderPager(rows.length, pageCount);
+
     if (currentForwarders.length === 0) {
         tbody.innerHTML = '<tr><td colspan="3" class="no-data">No email forwarders configured</td></tr>';
         return;
     }
+    if (rows.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="3" class="no-data">No forwarders match the filter</td></tr>';
+        return;
+    }
+
+    const start = forwarderPage * FORWARDER_PAGE_SIZE;
+    const fragment = document.createDocumentFragment();
+    rows.slice(start, start + FORWARDER_PAGE_SIZE).forEach(forwarder => {
+        fragment.appendChild(buildForwarderRow(forwarder));
+    });
+    tbody.appendChild(fragment);
+}
 
-    currentForwarders.forEach(forwarder => {
-        const row = document.createElement('tr');
+// Show the pager only when the list does not fit on one page
+function updateForwarderPager(total, pageCount) {
+    const pager = document.getElementById('forwardersPager');
+    if (!pager) return;
 
-        // Create cells
-        const fromCell = document.createElement('td');
-        fromCell.textContent = forwarder.address || 'Unknown';
+    pager.style.display = pageCount > 1 ? '' : 'none';
+    document.getElementById('forwardersPageInfo').textContent =
+        `Page ${forwarderPage + 1} of ${pageCount} (${total} forwarders)`;
+    document.getElementById('forwardersPrev').disabled = forwarderPage === 0;
+    document.getElementById('forwardersNext').disabled = forwarderPage >= pageCount - 1;
+}
+
+// Move to another page of the forwarder table
+function changeForwarderPage(step) {
+    forwarderPage = Math.max(0, forwarderPage + step);
+    displayForwarders();
+}
 
-        const toCell = document.createElement('td');
-        toCell.textContent = forwarder.destination || 'Unknown';
+// Work out which (address, destination) pairs were added and removed between two lists
+function diffForwarders(oldList, newList) {
+    const oldKeys = new Set(oldList.map(forwarderKey));
+    const newKeys = new Set(newList.map(forwarderKey));
+    return {
+        added: newList.filter(f => !oldKeys.has(forwarderKey(f))),
+        removed: oldList.filter(f => !newKeys.has(forwarderKey(f)))
+    };
+}
 
-        const actionsCell = document.createElement('td');
-        const deleteBtn = document.createElement('button');
-        deleteBtn.className = 'btn-danger';
-        deleteBtn.textContent = 'Delete';
-        deleteBtn.onclick = () => deleteForwarder(forwarder.address);
-        actionsCell.appendChild(deleteBtn);
+// Apply added/removed pairs to the list; only the visible page is re-rendered
+function applyForwarderDelta(added, removed) {
+    const removedKeys = new Set(removed.map(forwarderKey));
+    currentForwarders = currentForwarders
+        .filter(f => !removedKeys.has(forwarderKey(f)))
+        .concat(added);
 
-        row.appendChild(fromCell);
-        row.appendChild(toCell);
-        row.appendChild(actionsCell);
-        tbody.appendChild(row);
-    });
+    displayForwarders();
 }
 
 // Create new forwarder
@@ -474,12 +718,22 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load initial data
     loadDomains();
 
-    // Set up auto-refresh every 60 seconds
-    setInterval(() => {
-        if (selectedDomain) {
-            loadForwarders();
-        }
-    }, 60000);
+    // Live updates start once the first domain has loaded (see loadDomains)
+
+    // Filter and page the forwarder table
+    const filterInput = document.getElementById('forwarderFilter');
+    if (filterInput) {
+        filterInput.addEventListener('input', () => {
+            clearTimeout(forwarderFilterTimer);
+            forwarderFilterTimer = setTimeout(() => {
+                forwarderFilter = filterInput.value.trim();
+                forwarderPage = 0;
+                displayForwarders();
+            }, 200);
+        });
+    }
+    document.getElementById('forwardersPrev')?.addEventListener('click', () => changeForwarderPage(-1));
+    document.getElementById('forwardersNext')?.addEventListener('click', () => changeForwarderPage(1));
 
     // Set up form handler
     const form = document.getElementById('createForwarderForm');
@@ -132,26 +132,30 @@ function renderDomains() {
 
 async function addDomain() {
     const input = document.getElementById('new_domain');
-    const domain = input.value.trim();
+    // Several domains may be pasted at once, separated by commas or whitespace
+    const domains = input.value.split(/[\s,]+/).filter(d => d);
 
-    if (!domain) {
+    if (domains.length === 0) {
         showMessage('error', 'Please enter a domain name');
         return;
     }
 
-    if (!domain.includes('.') || domain.includes(' ')) {
-        showMessage('error', 'Please enter a valid domain name');
+    const invalid = domains.find(d => !d.includes('.'));
+    if (invalid) {
+        showMessage('error', `Please enter a valid domain name: ${invalid}`);
         return;
     }
 
+    const bulk = domains.length > 1;
+
     try {
-        const response = await fetch('/settings/api/domains', {
+        const response = await fetch(bulk ? '/settings/api/domains/bulk' : '/settings/api/domains', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             credentials: 'same-origin',
-            body: JSON.stringify({ domain })
+            body: JSON.stringify(bulk ? { domains } : { domain: domains[0] })
         });
 
         const result = await response.json();
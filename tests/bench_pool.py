@@ -0,0 +1,73 @@
+"""Per-request latency of DirectAdmin calls with and without the pooled session registry
+
+Run from the project root:
+
+    python tests/bench_pool.py [--calls 300] [--tls]
+
+"before" makes one module-level requests.get() per call, as the client did before the
+session registry; "after" goes through DirectAdminAPI and its shared keep-alive session.
+Both talk to the same local stand-in panel, so the difference is connection setup alone
+(plus a TLS handshake per call with --tls).
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+
+import requests
+from panel import StandInPanel
+from app.directadmin_api import DirectAdminAPI, session_registry
+
+
+def _measure(calls, func):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=300)
+    parser.add_argument('--tls', action='store_true', help='serve the stand-in panel over HTTPS')
+    args = parser.parse_args()
+
+    with StandInPanel(tls=args.tls) as panel:
+        panel.forwarders['example.com'] = {f'alias{i}': f'user{i}@example.net' for i in range(20)}
+        url = f"{panel.url}/CMD_API_EMAIL_FORWARDERS"
+        params = {'domain': 'example.com', 'action': 'list'}
+
+        def unpooled():
+            requests.get(url, params=params, auth=(panel.username, panel.password), verify=False, timeout=5)
+
+        api = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+
+        def pooled():
+            api._make_request('/CMD_API_EMAIL_FORWARDERS', params, method='GET')
+
+        # The client logs every call to stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            unpooled(), pooled()  # warm up
+            before = _measure(args.calls, unpooled)
+            after = _measure(args.calls, pooled)
+        session_registry.close_all()
+
+    scheme = 'https' if args.tls else 'http'
+    print(f"{args.calls} calls per run against a stand-in panel over {scheme}")
+    print(f"  before (requests.get per call): median {before[0]:.2f} ms, p95 {before[1]:.2f} ms")
+    print(f"  after  (pooled session):        median {after[0]:.2f} ms, p95 {after[1]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+# Config reads the environment at import time, so point it at a scratch data directory first
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='da-forwarder-tests-'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from panel import StandInPanel
+
+
+@pytest.fixture
+def quiet():
+    """Swallow the client's per-call logging"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def panel():
+    with StandInPanel(domains=['example.com', 'empty.com']) as panel:
+        panel.forwarders['example.com'] = {'info': 'a@x.com', 'sales': 'b@y.com,c@z.com'}
+        panel.accounts['empty.com'] = []
+        yield panel
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Module-level result caches would otherwise leak between tests"""
+    from app.directadmin_api import domain_cache, forwarder_cache, account_cache
+    from app.forwarder_feed import snapshot_cache
+    for cache in (domain_cache, forwarder_cache, account_cache, snapshot_cache):
+        cache.clear()
+    yield
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite database"""
+    from app.main import create_app
+    monkeypatch.setitem(os.environ, 'DA_JOB_RUNNER', '1')  # tests run jobs themselves
+    monkeypatch.setattr('app.config.Config.SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'users.db'}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def make_user(app, panel, username='reseller', password='pw', da_password=None, domains=('example.com',)):
+    """Create an app user whose DirectAdmin settings point at the stand-in panel"""
+    from app.models import db, User
+    with app.app_context():
+        user = User(username=username)
+        user.set_password(password)
+        user.da_server = panel.url
+        user.da_username = panel.username
+        user.set_da_password(da_password or panel.password)
+        db.session.add(user)
+        db.session.flush()
+        user.add_domains(list(domains))
+        db.session.commit()
+        return user.id
+
+
+def login(app, username='reseller', password='pw'):
+    client = app.test_client()
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.post('/login', data={'username': username, 'password': password})
+    return client
+
+
+def run_jobs():
+    """Run every due background job in this thread, as a job worker would"""
+    from app.job_queue import job_queue
+    with contextlib.redirect_stdout(io.StringIO()):
+        while True:
+            job = job_queue._claim()
+            if job is None:
+                return
+            job_queue._run(job)
+
+
+@contextlib.contextmanager
+def count_queries(app):
+    """Collect the SQL statements the app's engine runs inside the block"""
+    from app.models import db
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,164 @@
+"""Stand-in DirectAdmin panel for tests and benchmarks
+
+Serves the handful of CMD_API_* endpoints the app uses, with HTTP Basic auth, an
+in-memory forwarder table per domain and a log of every request it answered.
+"""
+import base64
+import datetime
+import http.server
+import os
+import socketserver
+import ssl
+import tempfile
+import threading
+import time
+import urllib.parse
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, keep-alive replies stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _send(self, status, body, content_type='text/plain'):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        panel = self.server.panel
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+        path, _, query = self.path.partition('?')
+        params = dict(urllib.parse.parse_qsl(query))
+        params.update(urllib.parse.parse_qsl(body))
+
+        auth = self.headers.get('Authorization', '')
+        user = password = None
+        if auth.startswith('Basic '):
+            user, _, password = base64.b64decode(auth[6:]).decode().partition(':')
+        with panel.lock:
+            panel.calls.append((self.command, path, params, user))
+        if (user, password) != (panel.username, panel.password):
+            self._send(401, 'Unauthorized')
+            return
+
+        if panel.delay:
+            time.sleep(panel.delay)
+        self._send(200, panel.answer(path, params))
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _self_signed_context():
+    """Server-side TLS context with a throwaway certificate for 127.0.0.1"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), False)
+            .sign(key, hashes.SHA256()))
+    directory = tempfile.mkdtemp()
+    cert_path, key_path = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class StandInPanel:
+    """A local DirectAdmin look-alike; use as a context manager or call start()/stop()"""
+
+    def __init__(self, username='reseller', password='secret', domains=None, tls=False, delay=0):
+        self.username = username
+        self.password = password
+        self.delay = delay
+        self.tls = tls
+        self.lock = threading.Lock()
+        self.calls = []
+        # domain -> {alias: destination}; a domain without forwarders answers with an empty body
+        self.forwarders = {domain: {} for domain in (domains or ['example.com'])}
+        # domain -> mailbox usernames; an empty list also answers with an empty body
+        self.accounts = {domain: ['alice', 'bob'] for domain in self.forwarders}
+        self._server = None
+
+    @property
+    def url(self):
+        scheme = 'https' if self.tls else 'http'
+        return f"{scheme}://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.panel = self
+        if self.tls:
+            self._server.socket = _self_signed_context().wrap_socket(self._server.socket, server_side=True)
+        threading.Thread(target=self._server.serve_forever, name='stand-in-panel', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def calls_to(self, endpoint):
+        with self.lock:
+            return [call for call in self.calls if call[1] == endpoint]
+
+    def answer(self, path, params):
+        """Response body for an authenticated request"""
+        if path == '/CMD_API_SHOW_DOMAINS':
+            return '&'.join(f"list[]={d}" for d in self.forwarders)
+
+        if path == '/CMD_API_POP':
+            return '&'.join(f"list[]={user}" for user in self.accounts.get(params.get('domain'), []))
+
+        if path == '/CMD_API_EMAIL_FORWARDERS':
+            domain = params.get('domain')
+            if domain not in self.forwarders:
+                return 'error=1&text=Unknown domain'
+            table = self.forwarders[domain]
+            action = params.get('action', 'list')
+            with self.lock:
+                if action == 'create':
+                    table[params['user']] = params['email']
+                    return 'error=0&text=Forwarder created'
+                if action == 'delete':
+                    for key, alias in params.items():
+                        if key.startswith('select'):
+                            table.pop(alias, None)
+                    return 'error=0&text=Forwarders deleted'
+                return '&'.join(f"{alias}={urllib.parse.quote(dest)}" for alias, dest in sorted(table.items()))
+
+        return 'error=0&text=ok'
@@ -0,0 +1,228 @@
+"""Stand-in Redis server for tests
+
+Speaks enough RESP for the cache's RedisBackend: AUTH, SELECT, GET, SET with PX, PTTL, DEL,
+SCAN with MATCH/COUNT and WATCH/MULTI/EXEC/UNWATCH, with keys kept per database in memory.
+"""
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+
+
+class _Simple(str):
+    """A +status reply rather than a bulk string"""
+
+
+class _NullArray:
+    """The *-1 reply of an aborted EXEC"""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server.stand_in
+        with server.lock:
+            server.connections.append(self.connection)
+        state = {'authed': server.password is None, 'db': 0, 'watched': {}, 'queue': None}
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, OSError, ValueError):
+                return
+            if args is None:
+                return
+            with server.lock:
+                server.commands.append(args)
+            self.wfile.write(self._encode(server.execute(state, args)))
+            self.wfile.flush()
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            raise ValueError(f"Inline commands are not supported: {line!r}")
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def _encode(self, reply):
+        if isinstance(reply, _NullArray):
+            return b'*-1\r\n'
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, Exception):
+            return f"-{reply}\r\n".encode()
+        if isinstance(reply, _Simple):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, list):
+            return f"*{len(reply)}\r\n".encode() + b''.join(self._encode(item) for item in reply)
+        data = str(reply).encode()
+        return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandInRedis:
+    """A local Redis look-alike; use as a context manager or call start()/stop()"""
+
+    def __init__(self, password=None, scan_page=None):
+        self.password = password
+        # Largest SCAN page regardless of COUNT, to make clients walk the cursor
+        self.scan_page = scan_page
+        self.lock = threading.RLock()
+        self.data = {}  # (db, key) -> (value, expires_at or None)
+        self.versions = {}  # (db, key) -> writes so far, for WATCH
+        self.commands = []
+        self.connections = []
+        # Called with this server just before each EXEC is applied, e.g. to simulate contention
+        self.before_exec = None
+        self._scans = {}  # cursor -> keys still to return
+        self._next_scan = 0
+        self._server = None
+
+    @property
+    def url(self):
+        auth = f":{self.password}@" if self.password else ''
+        return f"redis://{auth}127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.stand_in = self
+        threading.Thread(target=self._server.serve_forever, name='stand-in-redis', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self.drop_connections()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def drop_connections(self):
+        """Close every client socket, as a restarting server would"""
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            try:
+                # The handler's file objects keep the socket open; shutdown ends it for both sides
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+
+    def keys(self, db=0):
+        with self.lock:
+            return sorted(k for d, k in self.data if d == db and self._live(d, k))
+
+    def touch(self, db, key):
+        """Rewrite a key unchanged, as a concurrent writer would; it keeps its expiry"""
+        with self.lock:
+            self._set(db, key, *self.data[(db, key)])
+
+    # ----- command handling -----
+
+    def _live(self, db, key):
+        entry = self.data.get((db, key))
+        if entry is None:
+            return False
+        if entry[1] is not None and time.time() >= entry[1]:
+            self._delete(db, key)
+            return False
+        return True
+
+    def _set(self, db, key, value, expires_at):
+        self.data[(db, key)] = (value, expires_at)
+        self.versions[(db, key)] = self.versions.get((db, key), 0) + 1
+
+    def _delete(self, db, key):
+        if self.data.pop((db, key), None) is None:
+            return 0
+        self.versions[(db, key)] = self.versions.get((db, key), 0) + 1
+        return 1
+
+    def execute(self, state, args):
+        name = args[0].upper()
+        if name == 'AUTH':
+            if args[1] != self.password:
+                return RuntimeError('WRONGPASS invalid username-password pair')
+            state['authed'] = True
+            return _Simple('OK')
+        if not state['authed']:
+            return RuntimeError('NOAUTH Authentication required.')
+
+        if state['queue'] is not None and name not in ('EXEC', 'MULTI', 'WATCH'):
+            state['queue'].append(args)
+            return _Simple('QUEUED')
+
+        with self.lock:
+            if name == 'MULTI':
+                state['queue'] = []
+                return _Simple('OK')
+            if name == 'EXEC':
+                queued, state['queue'] = state['queue'], None
+                if self.before_exec is not None:
+                    self.before_exec(self)
+                watched, state['watched'] = state['watched'], {}
+                if any(self.versions.get(k, 0) != v for k, v in watched.items()):
+                    return _NullArray()
+                return [self._apply(state, command) for command in queued]
+            if name == 'WATCH':
+                for key in args[1:]:
+                    state['watched'][(state['db'], key)] = self.versions.get((state['db'], key), 0)
+                return _Simple('OK')
+            if name == 'UNWATCH':
+                state['watched'] = {}
+                return _Simple('OK')
+            return self._apply(state, args)
+
+    def _apply(self, state, args):
+        name, db = args[0].upper(), state['db']
+        if name == 'SELECT':
+            state['db'] = int(args[1])
+            return _Simple('OK')
+        if name == 'GET':
+            return self.data[(db, args[1])][0] if self._live(db, args[1]) else None
+        if name == 'SET':
+            expires_at = None
+            if len(args) > 3 and args[3].upper() == 'PX':
+                expires_at = time.time() + int(args[4]) / 1000
+            self._set(db, args[1], args[2], expires_at)
+            return _Simple('OK')
+        if name == 'PTTL':
+            if not self._live(db, args[1]):
+                return -2
+            expires_at = self.data[(db, args[1])][1]
+            return -1 if expires_at is None else max(int((expires_at - time.time()) * 1000), 0)
+        if name == 'DEL':
+            return sum(self._delete(db, key) for key in args[1:])
+        if name == 'SCAN':
+            options = {args[i].upper(): args[i + 1] for i in range(2, len(args) - 1, 2)}
+            if args[1] == '0':
+                remaining = [k for k in self.keys(db) if fnmatch.fnmatchcase(k, options.get('MATCH', '*'))]
+            else:
+                # Like Redis, a scan in progress is not thrown off by keys deleted along the way
+                remaining = self._scans.pop(int(args[1]))
+            count = int(options.get('COUNT', 10))
+            if self.scan_page:
+                count = min(count, self.scan_page)
+            page, rest = remaining[:count], remaining[count:]
+            cursor = 0
+            if rest:
+                self._next_scan += 1
+                cursor = self._next_scan
+                self._scans[cursor] = rest
+            return [str(cursor), page]
+        return RuntimeError(f"ERR unknown command '{args[0]}'")
@@ -0,0 +1,64 @@
+"""The admin user listing: keyset pages, literal search and a page-size-independent query count"""
+import contextlib
+import io
+
+from conftest import count_queries, login
+
+
+def _admin(app, usernames):
+    """Plain users with two domains each, listed by the default admin the migrations create"""
+    from app.models import db, User
+    with app.app_context():
+        for username in usernames:
+            user = User(username=username)
+            user.set_password('pw')
+            db.session.add(user)
+            db.session.flush()
+            user.add_domains([f'{username}.com', f'{username}.net'])
+        db.session.commit()
+    return login(app, username='admin', password='changeme')
+
+
+def _page(client, query):
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = client.get(f'/admin/api/users?{query}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_next_cursor_walks_every_user_once(app):
+    names = [f'user{i:02d}' for i in range(7)]
+    client = _admin(app, reversed(names))
+
+    seen, cursor = [], ''
+    while True:
+        body = _page(client, f'limit=3&cursor={cursor}')
+        assert body['total'] == 8
+        seen += [user['username'] for user in body['users']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ['admin'] + names
+    first = _page(client, 'limit=3')['users'][1]
+    assert first['domains'] == ['user00.com', 'user00.net']
+
+
+def test_search_wildcards_match_literally(app):
+    client = _admin(app, ['a%b', 'axb', 'c_d', 'cxd', 'Big_Co'])
+    assert [u['username'] for u in _page(client, 'q=%')['users']] == ['a%b']
+    assert [u['username'] for u in _page(client, 'q=_')['users']] == ['Big_Co', 'c_d']
+    assert [u['username'] for u in _page(client, 'q=G_c')['users']] == ['Big_Co']
+    body = _page(client, 'q=_&limit=1')
+    assert body['total'] == 2 and body['next_cursor'] == 'Big_Co'
+    assert [u['username'] for u in _page(client, 'q=_&limit=1&cursor=Big_Co')['users']] == ['c_d']
+
+
+def test_statement_count_does_not_grow_with_the_page(app):
+    client = _admin(app, [f'user{i:02d}' for i in range(20)])
+    counts = []
+    for limit in (2, 20):
+        _page(client, f'limit={limit}')
+        with count_queries(app) as statements:
+            assert len(_page(client, f'limit={limit}&cursor=admin')['users']) == limit
+        counts.append(len(statements))
+    assert counts[0] == counts[1], counts
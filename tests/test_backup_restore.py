@@ -0,0 +1,22 @@
+"""An export must import back unchanged, including forwarders with several destinations"""
+import io
+
+from conftest import login, make_user, run_jobs
+
+
+def test_csv_export_imports_back(app, panel):
+    make_user(app, panel)
+    client = login(app)
+    original = dict(panel.forwarders['example.com'])
+    assert 'b@y.com,c@z.com' in original.values()
+
+    backup = client.get('/api/forwarders/export?format=csv').get_data()
+    panel.forwarders['example.com'].clear()
+
+    response = client.post('/api/forwarders/import', data={'file': (io.BytesIO(backup), 'backup.csv')})
+    assert response.status_code == 202, response.get_json()
+    run_jobs()
+    job = client.get(f"/api/jobs/{response.get_json()['job']['id']}").get_json()['job']
+    assert job['status'] == 'done', job
+    assert job['result']['rejected'] == 0 and job['result']['errors'] == [], job['result']
+    assert panel.forwarders['example.com'] == original
@@ -0,0 +1,86 @@
+"""Cached DirectAdmin results must only be served to callers holding the password that fetched them"""
+import threading
+import time
+
+from app.directadmin_api import DirectAdminAPI
+
+
+def test_wrong_password_does_not_reuse_cached_domains_or_forwarders(panel, quiet):
+    owner = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    assert owner.validate_domain_access()[0]
+    assert len(owner.get_forwarders()) == 2
+
+    panel.calls.clear()
+    intruder = DirectAdminAPI(panel.url, panel.username, 'WRONG', 'example.com')
+    assert intruder.validate_domain_access(allow_stale=True)[0] is False
+    assert intruder.get_forwarders() == []
+    assert intruder.get_forwarders_swr()[0] == []
+    # Every attempt had to go to the panel, which turned the password away
+    assert panel.calls and all(user == panel.username for _, _, _, user in panel.calls)
+
+
+def test_same_login_still_hits_the_cache(panel, quiet):
+    DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com').get_forwarders()
+    panel.calls.clear()
+    again = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    assert len(again.get_forwarders()) == 2
+    assert panel.calls == []
+
+
+def test_wrong_password_does_not_join_an_in_flight_read(panel, quiet):
+    panel.delay = 0.3
+    owner = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    intruder = DirectAdminAPI(panel.url, panel.username, 'WRONG', 'example.com')
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(owner=owner._read('/CMD_API_SHOW_DOMAINS')))
+    leader.start()
+    while not panel.calls:  # the owner's read is now in flight
+        time.sleep(0.01)
+    results['intruder'] = intruder._read('/CMD_API_SHOW_DOMAINS')
+    leader.join()
+    assert results['owner']['list'] == ['example.com', 'empty.com']
+    assert results['intruder'] is None
+
+
+def test_feed_topics_are_not_shared_across_passwords(panel, quiet):
+    from app.forwarder_feed import ForwarderFeed
+    feed = ForwarderFeed(interval=0.1, max_clients=10)
+    owner = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    intruder = DirectAdminAPI(panel.url, panel.username, 'WRONG', 'example.com')
+
+    owner_sub = feed.subscribe(owner)
+    assert len(owner_sub[1].get(timeout=5)['forwarders']) == 2
+    intruder_sub = feed.subscribe(intruder)
+    try:
+        assert owner_sub[0] != intruder_sub[0]
+        assert feed.stats()['domains'] == 2
+        time.sleep(0.3)
+        assert intruder_sub[1].empty()
+    finally:
+        feed.unsubscribe(owner_sub)
+        feed.unsubscribe(intruder_sub)
+
+
+def test_search_needs_the_password_that_indexed_the_forwarders(app, panel):
+    from conftest import login, make_user
+    make_user(app, panel, username='owner')
+    make_user(app, panel, username='intruder', da_password='WRONG')
+    owner = login(app, 'owner')
+    assert owner.get('/api/forwarders?domain=example.com').status_code == 200
+
+    found = owner.get('/api/forwarders/search?q=b@y.com').get_json()
+    assert [r['address'] for r in found['results']] == ['sales@example.com']
+
+    response = login(app, 'intruder').get('/api/forwarders/search?q=b@y.com')
+    assert response.status_code == 403
+    assert response.get_json()['results'] == []
+
+
+def test_search_skips_domains_the_login_does_not_hold(app, panel):
+    from conftest import login, make_user
+    make_user(app, panel, domains=('example.com', 'elsewhere.com'))
+    client = login(app)
+    assert client.get('/api/forwarders?domain=example.com').status_code == 200
+    found = client.get('/api/forwarders/search?q=info&field=alias').get_json()
+    assert found['count'] == 1
+    assert found['unverified_domains'] == ['elsewhere.com']
@@ -0,0 +1,69 @@
+import sqlite3
+import threading
+import time
+
+from app import da_cache
+from app.da_cache import SQLiteBackend
+
+
+def _accessed_at(backend, key):
+    with backend._connect() as conn:
+        return conn.execute("SELECT accessed_at FROM da_cache WHERE namespace = ? AND key = ?",
+                            (backend.namespace, key)).fetchone()[0]
+
+
+def test_sqlite_hits_only_touch_recency_once_per_resolution(tmp_path, monkeypatch):
+    backend = SQLiteBackend('test', 10, path=str(tmp_path / 'cache.db'))
+    now = [1000.0]
+    monkeypatch.setattr(da_cache.time, 'time', lambda: now[0])
+    backend.set('k', ['v'], ttl=600)
+
+    now[0] += SQLiteBackend.ACCESS_RESOLUTION / 2
+    assert backend.get('k') == (['v'], 1000.0)
+    assert _accessed_at(backend, 'k') == 1000.0
+
+    now[0] += SQLiteBackend.ACCESS_RESOLUTION
+    assert backend.get('k') == (['v'], 1000.0)
+    assert _accessed_at(backend, 'k') == now[0]
+
+
+def test_sqlite_connections_are_reused_by_short_lived_threads(tmp_path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(da_cache.sqlite3, 'connect', lambda *a, **kw: opened.append(1) or connect(*a, **kw))
+    backend = SQLiteBackend('test', 10, path=str(tmp_path / 'cache.db'))
+    backend.set('k', 1, ttl=600)
+
+    for _ in range(20):
+        thread = threading.Thread(target=backend.get, args=('k',))
+        thread.start()
+        thread.join()
+    assert len(opened) == 1
+
+
+def test_memory_caches_drop_keys_changed_in_another_process(tmp_path):
+    from app.da_cache import InvalidationLog, MemoryBackend, TTLCache
+    path = str(tmp_path / 'cache.db')
+    # Two logs on one file stand in for a request worker and the job runner
+    worker_log, runner_log = InvalidationLog(path, interval=0.01), InvalidationLog(path, interval=0.01)
+    worker = TTLCache('forwarders', 60, backend=MemoryBackend('forwarders', 10), invalidations=worker_log)
+    runner = TTLCache('forwarders', 60, backend=MemoryBackend('forwarders', 10), invalidations=runner_log)
+
+    worker.set('example.com', ['old'])
+    assert worker.get('example.com') == ['old']
+
+    runner.update('example.com', lambda value: value + ['new'])  # nothing cached there, still announced
+    time.sleep(0.02)
+    assert worker.get('example.com') is None
+
+    # A process does not drop its own write-throughs
+    worker.set('example.com', ['old'])
+    worker.update('example.com', lambda value: value + ['new'])
+    time.sleep(0.02)
+    assert worker.get('example.com') == ['old', 'new']
+
+
+def test_shared_backends_need_no_invalidation_log(tmp_path):
+    from app.da_cache import TTLCache
+    cache = TTLCache('shared', 60, backend=SQLiteBackend('shared', 10, path=str(tmp_path / 'cache.db')))
+    assert cache.invalidations is None
@@ -0,0 +1,98 @@
+"""Concurrent writers and readers across processes, as gunicorn workers hit the app database
+
+SQLite always runs. PostgreSQL runs when TEST_POSTGRES_URL points at a database the test may
+write to, e.g. TEST_POSTGRES_URL=postgresql://postgres@localhost/forwarder_test.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+PROCESSES = 2
+THREADS = 4  # writer threads per process, plus as many readers
+COMMITS = 100
+
+
+def _worker(results):
+    """One 'gunicorn worker': its own app and engine, reading DATABASE_URL from the environment"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.main import create_app
+        app = create_app()
+    from app.models import db, User
+    errors, latencies = [], []
+
+    def write():
+        with app.app_context():
+            for _ in range(COMMITS):
+                try:
+                    user = User.query.filter_by(username='admin').one()
+                    user.last_login = datetime.utcnow()
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(str(getattr(e, 'orig', e)))
+                finally:
+                    db.session.remove()
+
+    def read():
+        with app.app_context():
+            for _ in range(COMMITS):
+                start = time.perf_counter()
+                try:
+                    User.query.all()
+                    db.session.execute(db.text('SELECT COUNT(*) FROM user_domain')).scalar()
+                except Exception as e:
+                    errors.append(str(getattr(e, 'orig', e)))
+                finally:
+                    db.session.remove()
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=write) for _ in range(THREADS)]
+    threads += [threading.Thread(target=read) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    results.put((time.perf_counter() - start, errors, latencies[int(len(latencies) * 0.99)]))
+
+
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+
+@pytest.mark.parametrize('url', [
+    pytest.param('sqlite', id='sqlite'),
+    pytest.param(POSTGRES_URL, id='postgresql',
+                 marks=pytest.mark.skipif(not POSTGRES_URL, reason='TEST_POSTGRES_URL is not set')),
+])
+def test_concurrent_writes_across_processes(url, tmp_path, monkeypatch):
+    from app.config import Config, _engine_options
+    from app.main import create_app
+    if url == 'sqlite':
+        url = f"sqlite:///{tmp_path / 'users.db'}"
+    monkeypatch.setenv('DATABASE_URL', url)
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', url)
+    monkeypatch.setattr(Config, 'SQLALCHEMY_ENGINE_OPTIONS', _engine_options(url))
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_app()  # migrate once, as gunicorn --preload does
+
+    # Fresh interpreters, so each worker builds its engine from DATABASE_URL like a real one
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(results,)) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    errors = [error for _, worker_errors, _ in outcomes for error in worker_errors]
+    print(f"\n{url.split(':')[0]}: {PROCESSES} processes x {THREADS} writers + {THREADS} readers x {COMMITS}: "
+          f"slowest process {max(o[0] for o in outcomes):.2f}s, read p99 {max(o[2] for o in outcomes) * 1000:.1f} ms")
+    assert errors == []
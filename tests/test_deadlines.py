@@ -0,0 +1,57 @@
+"""The per-request DirectAdmin budget: an exhausted budget is a 504, never a generic failure"""
+import time
+
+import pytest
+
+from conftest import login, make_user
+from app.directadmin_api import DirectAdminAPI, DeadlineExceeded, deadline
+
+
+def test_connection_test_with_no_budget_left_raises(panel, quiet):
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            api.test_connection()
+    assert panel.calls == []
+
+
+def test_slow_panel_turns_the_connection_test_into_a_504(app, panel, monkeypatch):
+    make_user(app, panel)
+    client = login(app)
+    monkeypatch.setitem(app.config['DA_ROUTE_DEADLINES'], 'settings.test_connection', 0.5)
+    panel.delay = 3
+
+    start = time.perf_counter()
+    response = client.post('/settings/api/test-connection', json={})
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 504
+    assert response.get_json()['timeout'] is True
+    assert elapsed < 1.5
+
+
+def test_follower_outlives_a_leader_whose_deadline_ran_out(panel, quiet):
+    import threading
+    panel.delay = 0.5
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    results = {}
+
+    def leader():
+        with deadline(0.2):
+            try:
+                results['leader'] = api._read('/CMD_API_SHOW_DOMAINS')
+            except DeadlineExceeded as e:
+                results['leader'] = e
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    while not panel.calls:  # the leader's read is now in flight
+        time.sleep(0.01)
+    with deadline(5):
+        results['follower'] = api._read('/CMD_API_SHOW_DOMAINS')
+    thread.join()
+
+    assert isinstance(results['leader'], DeadlineExceeded)
+    assert results['follower']['list'] == ['example.com', 'empty.com']
+    assert len(panel.calls) == 2
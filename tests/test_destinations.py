@@ -0,0 +1,33 @@
+"""Forwarder destinations: single addresses, local users, special targets and comma-separated lists"""
+import pytest
+
+from conftest import login, make_user
+from app.directadmin_api import DirectAdminAPI
+
+
+@pytest.mark.parametrize('destination, expected', [
+    ('a@x.com', 'a@x.com'),
+    ('alice', 'alice@example.com'),
+    ('a@x.com,b@y.com', 'a@x.com,b@y.com'),
+    (' a@x.com , bob ', 'a@x.com,bob@example.com'),
+    (':blackhole:', ':blackhole:'),
+    ('|/usr/local/bin/handler --a,b', '|/usr/local/bin/handler --a,b'),
+])
+def test_valid_destinations(destination, expected):
+    api = DirectAdminAPI('http://panel', 'reseller', 'pw', 'example.com')
+    assert api.normalize_destination(destination) == (expected, None)
+
+
+@pytest.mark.parametrize('destination', ['', ' , ', 'a@x.com,not an address', 'a@x.com,b@'])
+def test_invalid_destinations(destination):
+    api = DirectAdminAPI('http://panel', 'reseller', 'pw', 'example.com')
+    assert api.normalize_destination(destination)[1]
+
+
+def test_create_forwarder_with_several_destinations(app, panel):
+    make_user(app, panel)
+    client = login(app)
+    response = client.post('/api/forwarders', json={'domain': 'example.com', 'address': 'team',
+                                                    'destination': 'a@x.com, b@y.com'})
+    assert response.status_code == 200, response.get_json()
+    assert panel.forwarders['example.com']['team'] == 'a@x.com,b@y.com'
@@ -0,0 +1,68 @@
+"""A domain without forwarders answers with an empty body, which is an empty list and not a failure"""
+import io
+import json
+
+from conftest import login, make_user, run_jobs
+from app.directadmin_api import DirectAdminAPI, variant_memory
+
+
+def test_empty_domain_is_an_empty_list_and_is_cached(panel, quiet):
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'empty.com')
+    assert api.load_forwarders() == []
+    remembered = variant_memory.get(panel.url, 'forwarders')
+    assert remembered is not None
+
+    panel.calls.clear()
+    assert api.load_forwarders() == []
+    assert panel.calls == []
+
+    # A forced refresh goes straight to the remembered variant and keeps it
+    assert api.refresh_forwarders() == []
+    assert len(panel.calls) == 1
+    assert variant_memory.get(panel.url, 'forwarders') == remembered
+
+
+def test_routes_handle_an_empty_domain(app, panel):
+    make_user(app, panel, domains=('example.com', 'empty.com'))
+    client = login(app)
+
+    lines = [json.loads(line) for line in client.get('/api/forwarders/all').get_data(as_text=True).splitlines()]
+    empty = next(line for line in lines if line.get('domain') == 'empty.com')
+    assert empty['success'] and empty['forwarders'] == []
+    assert lines[-1] == {'done': True, 'domains': 2, 'errors': 0}
+
+    csv_export = client.get('/api/forwarders/export?format=csv').get_data(as_text=True)
+    assert csv_export.splitlines()[0] == 'domain,address,destination'
+    assert 'info@example.com' in csv_export
+
+    plan = client.post('/api/forwarders/sync', json={'state': {'empty.com': {'first': 'a@x.com'}},
+                                                     'dry_run': True}).get_json()
+    assert plan['success']
+    assert plan['plan']['creates'] == [{'op': 'create', 'domain': 'empty.com', 'address': 'first@empty.com',
+                                        'destination': 'a@x.com'}]
+
+    upload = io.BytesIO(b'domain,address,destination\nempty.com,hello,a@x.com\n')
+    response = client.post('/api/forwarders/import', data={'file': (upload, 'import.csv')})
+    assert response.status_code == 202
+    run_jobs()
+    job = client.get(f"/api/jobs/{response.get_json()['job']['id']}").get_json()['job']
+    assert job['status'] == 'done', job
+    assert panel.forwarders['empty.com'] == {'hello': 'a@x.com'}
+
+
+def test_domain_without_mailboxes_is_an_empty_list_and_is_cached(panel, quiet):
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'empty.com')
+    assert api.get_email_accounts() == []
+    remembered = variant_memory.get(panel.url, 'email_accounts')
+    assert remembered is not None
+    assert len(panel.calls_to('/CMD_API_POP')) == 1
+
+    panel.calls.clear()
+    assert api.get_email_accounts() == []
+    assert api.get_email_accounts_swr()[0] == []
+    assert panel.calls == []
+
+    # An uncached read goes straight to the remembered variant and keeps it
+    assert api.get_email_accounts(refresh=True) == []
+    assert len(panel.calls) == 1
+    assert variant_memory.get(panel.url, 'email_accounts') == remembered
@@ -0,0 +1,63 @@
+"""Strong ETags on the JSON read routes; the volatile cache age is not part of them"""
+import pytest
+
+from conftest import login, make_user
+from app.directadmin_api import DirectAdminAPI, account_cache, forwarder_cache
+
+
+def _age(panel, cache, seconds):
+    """Backdate the cached example.com entry without changing its content"""
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    value, stored_at = cache.get_entry(api.cache_key)
+    cache.backend.set(cache._key(api.cache_key), value, cache.ttl + cache.stale_ttl, stored_at=stored_at - seconds)
+
+
+@pytest.mark.parametrize('url, cache', [
+    ('/api/forwarders?domain=example.com&allow_stale=1', forwarder_cache),
+    ('/api/email-accounts?domain=example.com&allow_stale=1', account_cache),
+])
+def test_repeat_with_etag_is_304_after_the_entry_aged(app, panel, url, cache):
+    make_user(app, panel)
+    client = login(app)
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.get_json()['success']
+    etag = first.headers['ETag']
+    assert etag
+
+    _age(panel, cache, 30)
+    aged = client.get(url)
+    assert aged.get_json()['age'] >= 30 and not aged.get_json()['stale']
+    assert aged.headers['ETag'] == etag
+
+    repeat = client.get(url, headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.get_data() == b''
+    assert repeat.headers['ETag'] == etag
+
+
+def test_forwarder_etag_changes_with_the_data(app, panel):
+    make_user(app, panel)
+    client = login(app)
+    url = '/api/forwarders?domain=example.com'
+    etag = client.get(url).headers['ETag']
+
+    client.post('/api/forwarders', json={'domain': 'example.com', 'address': 'new', 'destination': 'd@x.com'})
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_domains_etag(app, panel):
+    make_user(app, panel)
+    client = login(app)
+
+    first = client.get('/api/domains')
+    assert first.status_code == 200 and first.get_json()['domains'] == ['example.com']
+    etag = first.headers['ETag']
+
+    repeat = client.get('/api/domains', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304 and repeat.get_data() == b''
+
+    client.post('/settings/api/domains/bulk', json={'domains': ['other.com']})
+    assert client.get('/api/domains', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,23 @@
+"""Jobs run in a separate runner process under gunicorn; request processes only enqueue while it lives"""
+import subprocess
+import sys
+
+from app.job_queue import job_queue
+
+
+def test_enqueue_leaves_jobs_to_a_live_runner(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(job_queue, 'start', lambda *args: started.append(1))
+    sleeper = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        monkeypatch.setenv('DA_JOB_RUNNER', str(sleeper.pid))
+        job_queue.enqueue('noop', {})
+        assert started == []
+    finally:
+        sleeper.kill()
+        sleeper.wait()
+
+    # The runner is gone, so this process has to run its jobs itself
+    job_queue.enqueue('noop', {})
+    assert started == [1]
+    job_queue._connect().execute("DELETE FROM jobs WHERE kind = 'noop'")
@@ -0,0 +1,79 @@
+"""Schema migrations: what they build, how they upgrade old databases and what a current schema costs at boot"""
+import contextlib
+import io
+import sqlite3
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.models import db
+
+
+def _schema(app):
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        return {table: ({c['name'] for c in inspector.get_columns(table)},
+                        {i['name'] for i in inspector.get_indexes(table)})
+                for table in inspector.get_table_names()}
+
+
+def test_migrations_build_the_schema_of_the_models(app):
+    expected = {table.name: ({c.name for c in table.columns}, {i.name for i in table.indexes})
+                for table in db.metadata.sorted_tables}
+    assert _schema(app) == expected
+
+
+def test_default_admin_works_through_the_model(app):
+    from app.models import User
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        assert admin.is_admin and admin.check_password('changeme')
+        admin.set_da_password('secret')
+        assert admin.get_da_password() == 'secret'
+
+
+def test_pre_versioning_database_is_upgraded(tmp_path, monkeypatch):
+    path = tmp_path / 'users.db'
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE,"
+                   " password_hash VARCHAR(120) NOT NULL, totp_secret VARCHAR(32), totp_enabled BOOLEAN,"
+                   " is_admin BOOLEAN, created_at DATETIME, last_login DATETIME, da_server VARCHAR(255),"
+                   " da_username VARCHAR(255), da_password_encrypted TEXT, da_domain VARCHAR(255),"
+                   " theme_preference VARCHAR(20), encryption_key VARCHAR(255))")
+    legacy.execute("INSERT INTO user (username, password_hash, is_admin, da_domain) VALUES ('old', 'x', 1, 'old.com')")
+    legacy.commit()
+    legacy.close()
+
+    from app.main import create_app
+    monkeypatch.setattr('app.config.Config.SQLALCHEMY_DATABASE_URI', f'sqlite:///{path}')
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    with app.app_context():
+        rows = db.session.execute(db.text("SELECT u.username, d.domain FROM user_domain d"
+                                          " JOIN user u ON u.id = d.user_id")).all()
+        admins = db.session.execute(db.text("SELECT COUNT(*) FROM user WHERE is_admin")).scalar()
+    assert rows == [('old', 'old.com')]
+    assert admins == 1  # the legacy admin counts, so no default admin was seeded
+    assert 'uq_user_domain_user_domain' in _schema(app)['user_domain'][1]
+
+
+def test_boot_on_a_current_schema(app, monkeypatch):
+    """The app fixture already migrated this database; booting again only checks the version"""
+    from app.main import create_app
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            create_app()
+            elapsed = time.perf_counter() - start
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+
+    assert len(statements) == 1, statements
+    assert elapsed < 1.0, f"create_app() took {elapsed * 1000:.0f} ms"
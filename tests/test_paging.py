@@ -0,0 +1,71 @@
+"""Paged, sorted and filtered forwarder listings on /api/forwarders"""
+import base64
+import json
+
+from conftest import login, make_user
+
+URL = '/api/forwarders?domain=example.com'
+
+
+def _client(app, panel):
+    # Aliases and destinations sort in opposite orders
+    panel.forwarders['example.com'] = {f'user{i}': f'{chr(ord("j") - i)}@dest.com' for i in range(10)}
+    make_user(app, panel)
+    return login(app)
+
+
+def _addresses(body):
+    return [f['address'].split('@')[0] for f in body['forwarders']]
+
+
+def test_cursor_is_stable_when_rows_are_inserted_before_it(app, panel):
+    client = _client(app, panel)
+    first = client.get(f'{URL}&limit=4').get_json()
+    assert _addresses(first) == ['user0', 'user1', 'user2', 'user3']
+    assert first['total'] == 10
+
+    # A forwarder that sorts before the cursor appears between page requests
+    created = client.post('/api/forwarders', json={'domain': 'example.com', 'address': 'user00',
+                                                   'destination': 'z@dest.com'})
+    assert created.status_code == 200
+
+    second = client.get(f"{URL}&limit=4&cursor={first['next_cursor']}").get_json()
+    assert _addresses(second) == ['user4', 'user5', 'user6', 'user7']
+    assert second['total'] == 11
+    last = client.get(f"{URL}&limit=4&cursor={second['next_cursor']}").get_json()
+    assert _addresses(last) == ['user8', 'user9']
+    assert last['next_cursor'] is None
+
+
+def test_reverse_orderings(app, panel):
+    client = _client(app, panel)
+    by_address = client.get(f'{URL}&sort=-address&limit=3').get_json()
+    assert _addresses(by_address) == ['user9', 'user8', 'user7']
+    following = client.get(f"{URL}&sort=-address&limit=3&cursor={by_address['next_cursor']}").get_json()
+    assert _addresses(following) == ['user6', 'user5', 'user4']
+
+    by_destination = client.get(f'{URL}&sort=-destination&limit=3').get_json()
+    assert [f['destination'] for f in by_destination['forwarders']] == ['j@dest.com', 'i@dest.com', 'h@dest.com']
+    assert [f['destination'] for f in client.get(f'{URL}&sort=destination&limit=2').get_json()['forwarders']] \
+        == ['a@dest.com', 'b@dest.com']
+
+
+def test_filter_and_limit_clamp(app, panel, monkeypatch):
+    client = _client(app, panel)
+    monkeypatch.setitem(app.config, 'DA_MAX_PAGE_SIZE', 4)
+    body = client.get(f'{URL}&limit=1000').get_json()
+    assert len(body['forwarders']) == 4 and body['next_cursor']
+    assert len(client.get(f'{URL}&limit=0').get_json()['forwarders']) == 4  # 0 falls back to DA_PAGE_SIZE, clamped
+
+    found = client.get(f'{URL}&q=B@DEST').get_json()
+    assert _addresses(found) == ['user8'] and found['total'] == 1
+
+
+def test_bad_sort_and_cursors_are_rejected(app, panel):
+    client = _client(app, panel)
+    not_a_list = base64.urlsafe_b64encode(json.dumps({'a': 1}).encode()).decode().rstrip('=')
+    wrong_length = base64.urlsafe_b64encode(json.dumps(['a']).encode()).decode().rstrip('=')
+    for query in ('sort=size', 'sort=-size', 'cursor=!!!', f'cursor={not_a_list}', f'cursor={wrong_length}'):
+        response = client.get(f'{URL}&{query}')
+        assert response.status_code == 400, query
+        assert response.get_json()['forwarders'] == []
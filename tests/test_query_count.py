@@ -0,0 +1,25 @@
+"""Routes that only need the logged-in user and its domains run a single SQL statement"""
+import contextlib
+import io
+
+import pytest
+
+from conftest import count_queries, login, make_user
+
+
+@pytest.mark.parametrize('path', [
+    '/dashboard',
+    '/settings/api/domains',
+    '/api/domains',
+    '/api/forwarders?domain=example.com',
+    '/api/email-accounts?domain=example.com',
+    '/api/domain-snapshot?domain=example.com',
+])
+def test_user_and_domains_load_in_one_statement(app, panel, path):
+    make_user(app, panel, domains=('example.com', 'empty.com'))
+    client = login(app)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert client.get(path).status_code == 200  # warm the DirectAdmin caches and the forwarder index
+        with count_queries(app) as statements:
+            assert client.get(path).status_code == 200
+    assert len(statements) == 1, statements
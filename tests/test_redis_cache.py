@@ -0,0 +1,76 @@
+"""The RESP client behind DA_CACHE_BACKEND=redis://, against the stand-in in tests/resp.py"""
+import pytest
+
+from resp import StandInRedis
+from app.da_cache import RedisBackend, TTLCache
+
+
+@pytest.fixture
+def redis():
+    with StandInRedis(password='s3cret', scan_page=2) as server:
+        yield server
+
+
+def _cache(redis, db=3):
+    backend = RedisBackend('forwarders', 100, url=f"{redis.url}/{db}")
+    return TTLCache('forwarders', 60, backend=backend)
+
+
+def test_round_trip_through_ttl_cache(redis):
+    cache = _cache(redis)
+    assert cache.invalidations is None  # shared backend
+
+    cache.set(('srv', 'user', 'example.com'), [{'address': 'a@example.com'}])
+    assert cache.get(('srv', 'user', 'example.com')) == [{'address': 'a@example.com'}]
+    assert cache.get(('srv', 'user', 'other.com')) is None
+    # Authenticated, and the keys went to the database from the URL
+    assert ['AUTH', 's3cret'] in redis.commands and ['SELECT', '3'] in redis.commands
+    assert redis.keys(db=3) and not redis.keys(db=0)
+
+    assert cache.update(('srv', 'user', 'example.com'), lambda value: value + [{'address': 'b@example.com'}])
+    assert len(cache.get(('srv', 'user', 'example.com'))) == 2
+    assert cache.update(('srv', 'user', 'missing.com'), lambda value: value) is False
+
+    cache.delete(('srv', 'user', 'example.com'))
+    assert cache.get(('srv', 'user', 'example.com')) is None
+
+
+def test_clear_and_size_walk_every_scan_page(redis):
+    cache = _cache(redis)
+    other = TTLCache('accounts', 60, backend=RedisBackend('accounts', 100, url=f"{redis.url}/3"))
+    for i in range(5):
+        cache.set(f'domain{i}', i)
+    other.set('kept', 1)
+
+    assert cache.stats()['size'] == 5
+    cache.clear()
+    assert cache.stats()['size'] == 0
+    assert other.get('kept') == 1  # only this namespace was cleared
+
+
+def test_update_gives_up_and_invalidates_under_contention(redis, quiet):
+    cache = _cache(redis)
+    cache.set('example.com', ['old'])
+    full_key = cache.backend._key('example.com')
+    # Another writer touches the key between every WATCH and EXEC
+    redis.before_exec = lambda server: server.touch(3, full_key)
+
+    assert cache.update('example.com', lambda value: value + ['new']) is False
+    assert redis.commands.count(['EXEC']) == 3
+    assert cache.get('example.com') is None
+
+
+def test_reconnects_after_the_server_drops_connections(redis):
+    cache = _cache(redis)
+    cache.set('example.com', ['kept'])
+    redis.drop_connections()
+    assert cache.get('example.com') == ['kept']
+    assert redis.commands.count(['AUTH', 's3cret']) == 2
+
+
+def test_wrong_password_degrades_to_misses(redis, quiet):
+    backend = RedisBackend('forwarders', 100, url=redis.url.replace('s3cret', 'wrong'))
+    cache = TTLCache('forwarders', 60, backend=backend)
+    cache.set('example.com', ['value'])
+    assert cache.get('example.com') is None
+    assert redis.keys() == []
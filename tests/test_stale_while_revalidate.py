@@ -0,0 +1,86 @@
+"""Expired entries inside the stale window are served at once and refreshed once in the background"""
+import threading
+import time
+
+from conftest import login, make_user
+from app.directadmin_api import DirectAdminAPI, forwarder_cache
+
+FORWARDERS = '/CMD_API_EMAIL_FORWARDERS'
+
+
+def _expire(api):
+    """Backdate the cached forwarders just past their TTL, still inside the stale window"""
+    value, stored_at = forwarder_cache.get_entry(api.cache_key)
+    forwarder_cache.backend.set(forwarder_cache._key(api.cache_key), value,
+                                forwarder_cache.ttl + forwarder_cache.stale_ttl,
+                                stored_at=stored_at - forwarder_cache.ttl - 1)
+
+
+def _wait_until_fresh(api, timeout=5):
+    deadline = time.monotonic() + timeout
+    while forwarder_cache.get_entry(api.cache_key) is None:
+        assert time.monotonic() < deadline, 'background refresh never landed'
+        time.sleep(0.05)
+
+
+def test_concurrent_stale_reads_share_one_background_refresh(panel, quiet, monkeypatch):
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    api.get_forwarders()
+
+    # Upstream calls alone would not tell, as the read coalescing merges overlapping refreshes too
+    refreshes = []
+    get_forwarders = DirectAdminAPI.get_forwarders
+
+    def counting(self, refresh=False):
+        if refresh:
+            refreshes.append(threading.current_thread().name)
+        return get_forwarders(self, refresh=refresh)
+
+    monkeypatch.setattr(DirectAdminAPI, 'get_forwarders', counting)
+    _expire(api)
+    panel.forwarders['example.com']['new'] = 'n@x.com'
+    panel.delay = 1
+    panel.calls.clear()
+
+    results = []
+
+    def read():
+        started = time.monotonic()
+        forwarders, age, stale = DirectAdminAPI(panel.url, panel.username, panel.password,
+                                                'example.com').get_forwarders_swr()
+        results.append((time.monotonic() - started, len(forwarders), age, stale))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    for elapsed, count, age, stale in results:
+        assert elapsed < panel.delay / 2  # nobody waited on the slow panel
+        assert stale and age > forwarder_cache.ttl
+        assert count == 2  # the old list
+
+    _wait_until_fresh(api)
+    assert refreshes == ['da-refresh']
+    assert len(panel.calls_to(FORWARDERS)) == 1
+    forwarders, age, stale = api.get_forwarders_swr()
+    assert not stale and len(forwarders) == 3
+    assert len(panel.calls_to(FORWARDERS)) == 1
+
+
+def test_route_serves_stale_forwarders_with_the_flag(app, panel):
+    make_user(app, panel)
+    client = login(app)
+    url = '/api/forwarders?domain=example.com&allow_stale=1'
+    assert client.get(url).get_json()['stale'] is False
+
+    api = DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com')
+    _expire(api)
+    panel.delay = 1
+    started = time.monotonic()
+    body = client.get(url).get_json()
+    assert time.monotonic() - started < panel.delay / 2
+    assert body['stale'] is True and len(body['forwarders']) == 2
+    _wait_until_fresh(api)
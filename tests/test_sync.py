@@ -0,0 +1,35 @@
+"""Desired-state sync: an unchanged document reads each domain once and writes nothing"""
+from app.bulk_operations import apply_sync, load_desired_state, plan_sync
+from app.directadmin_api import DirectAdminAPI
+
+STATE = """
+example.com:
+  info: a@x.com
+  sales: [b@y.com, c@z.com]
+empty.com: {}
+"""
+
+
+def test_unchanged_state_costs_one_read_per_domain_and_no_writes(panel, quiet):
+    # Remember the working request variant first, so probing is not counted as reads
+    DirectAdminAPI(panel.url, panel.username, panel.password, 'example.com').load_forwarders(refresh=True)
+    panel.calls.clear()
+
+    desired = load_desired_state(STATE, 'yaml')
+    plan = plan_sync(panel.url, panel.username, panel.password, desired, {'example.com', 'empty.com'})
+    assert plan['creates'] == [] and plan['deletes'] == [] and plan['errors'] == []
+    assert apply_sync(panel.url, panel.username, panel.password, plan) == []
+
+    reads = sorted(params['domain'] for _, _, params, _ in panel.calls_to('/CMD_API_EMAIL_FORWARDERS'))
+    assert reads == ['empty.com', 'example.com']
+    assert all(params.get('action', 'list') == 'list' for _, _, params, _ in panel.calls)
+
+
+def test_yaml_sync_through_the_route(app, panel):
+    from conftest import login, make_user
+    make_user(app, panel, domains=('example.com', 'empty.com'))
+    response = login(app).post('/api/forwarders/sync?dry_run=1', data=STATE,
+                               content_type='application/yaml')
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert body['plan']['creates'] == [] and body['plan']['deletes'] == []
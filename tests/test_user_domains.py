@@ -0,0 +1,72 @@
+"""A user's ordered domain list: bulk add, remove with gap closing and one-statement reorder"""
+from sqlalchemy import event
+
+from conftest import login, make_user
+from app.models import db, User, UserDomain
+
+
+def _orders(user_id):
+    return db.session.execute(
+        db.select(UserDomain.domain, UserDomain.order_index)
+        .where(UserDomain.user_id == user_id).order_by(UserDomain.order_index)
+    ).all()
+
+
+def _statements(app):
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_add_domains_skips_existing_and_appends_in_order(app, panel):
+    user_id = make_user(app, panel, domains=('a.com', 'b.com'))
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        added, skipped = user.add_domains(['d.com', 'b.com', 'c.com', 'd.com'])
+        db.session.commit()
+        assert (added, skipped) == (['d.com', 'c.com'], ['b.com'])
+        assert user.get_domains() == ['a.com', 'b.com', 'd.com', 'c.com']
+        assert [order for _, order in _orders(user_id)] == [0, 1, 2, 3]
+
+
+def test_remove_domain_closes_the_gap_with_one_range_update(app, panel):
+    user_id = make_user(app, panel, domains=('a.com', 'b.com', 'c.com', 'd.com'))
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        statements = _statements(app)
+        assert user.remove_domain('b.com')[0]
+        db.session.commit()
+        writes = [s for s in statements if s.startswith(('UPDATE', 'DELETE'))]
+        assert len(writes) == 2 and writes[1].startswith('UPDATE')
+        assert _orders(user_id) == [('a.com', 0), ('c.com', 1), ('d.com', 2)]
+        assert user.get_domains() == ['a.com', 'c.com', 'd.com']
+        assert user.remove_domain('missing.com') == (False, 'Domain not found')
+
+
+def test_reorder_domains_is_one_case_update(app, panel):
+    user_id = make_user(app, panel, domains=('a.com', 'b.com', 'c.com'))
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        statements = _statements(app)
+        assert user.reorder_domains(['c.com', 'a.com', 'b.com'])[0]
+        db.session.commit()
+        updates = [s for s in statements if s.startswith('UPDATE')]
+        assert len(updates) == 1 and 'CASE' in updates[0]
+        assert user.get_domains() == ['c.com', 'a.com', 'b.com']
+        assert _orders(user_id) == [('c.com', 0), ('a.com', 1), ('b.com', 2)]
+
+
+def test_bulk_add_route(app, panel):
+    make_user(app, panel, domains=('example.com',))
+    client = login(app)
+    body = client.post('/settings/api/domains/bulk',
+                       json={'domains': [' new.com', 'example.com', 'other.com']}).get_json()
+    assert body['added'] == ['new.com', 'other.com']
+    assert body['skipped'] == ['example.com']
+    assert body['domains'] == ['example.com', 'new.com', 'other.com']
+    assert client.get('/settings/api/domains').get_json()['domains'] == ['example.com', 'new.com', 'other.com']
+
+    response = client.post('/settings/api/domains/bulk', json={'domains': ['ok.com', 'not a domain']})
+    assert response.status_code == 400
+    assert response.get_json()['invalid'] == ['not a domain']